@@ -12,15 +12,25 @@ from alembic import context
 config = context.config
 
 # ensure project root is on sys.path so imports like `app.db.models` work
-sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
+_PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..'))
+if _PROJECT_ROOT not in sys.path:
+    sys.path.insert(0, _PROJECT_ROOT)
 
-# add your model's MetaData object here for 'autogenerate' support
-from app.db.models import Base  # noqa: E402
+# Interpret the config file for Python logging.
+if config.config_file_name is not None:
+    fileConfig(config.config_file_name)
 
-target_metadata = Base.metadata
+# add your model's MetaData object here for 'autogenerate' support; the
+# model graph is imported on first use rather than at env.py import time
+_TARGET_METADATA = None
 
-# Interpret the config file for Python logging.
-fileConfig(config.config_file_name)
+
+def _get_target_metadata():
+    global _TARGET_METADATA
+    if _TARGET_METADATA is None:
+        from app.db.models import Base
+        _TARGET_METADATA = Base.metadata
+    return _TARGET_METADATA
 
 
 def run_migrations_offline():
@@ -29,13 +39,13 @@ def run_migrations_offline():
     if url and url.strip().lower().startswith("env:"):
         env_key = url.split(':', 1)[1].strip()
         url = os.environ.get(env_key)
-    context.configure(url=url, target_metadata=target_metadata, literal_binds=True)
+    context.configure(url=url, target_metadata=_get_target_metadata(), literal_binds=True)
     with context.begin_transaction():
         context.run_migrations()
 
 
 def do_run_migrations(connection):
-    context.configure(connection=connection, target_metadata=target_metadata)
+    context.configure(connection=connection, target_metadata=_get_target_metadata())
     with context.begin_transaction():
         context.run_migrations()
 
@@ -48,18 +58,34 @@ def run_migrations_online():
         env_key = str(url_val).split(':', 1)[1].strip()
         cfg["sqlalchemy.url"] = os.environ.get(env_key)
 
+    # A single warm pooled connection is shared by every revision in the run
+    # instead of paying a fresh TCP/TLS handshake per connect (NullPool).
+    # pool_size / max_overflow / pool_pre_ping are read from alembic.ini.
+    cfg.setdefault("sqlalchemy.pool_size", "1")
+    cfg.setdefault("sqlalchemy.max_overflow", "0")
+    cfg.setdefault("sqlalchemy.pool_pre_ping", "false")
+
+    connect_args = {}
+    if str(cfg.get("sqlalchemy.url") or "").startswith("postgresql+asyncpg"):
+        # short-lived DDL statements never benefit from JIT compilation
+        connect_args["server_settings"] = {"jit": "off"}
+
     connectable = AsyncEngine(
         engine_from_config(
             cfg,
             prefix="sqlalchemy.",
-            poolclass=pool.NullPool,
+            poolclass=pool.AsyncAdaptedQueuePool,
+            connect_args=connect_args,
             future=True,
         )
     )
 
     async def run():
-        async with connectable.connect() as connection:
-            await connection.run_sync(do_run_migrations)
+        try:
+            async with connectable.connect() as connection:
+                await connection.run_sync(do_run_migrations)
+        finally:
+            await connectable.dispose()
 
     asyncio.run(run())
 
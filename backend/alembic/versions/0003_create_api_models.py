@@ -19,14 +19,24 @@ def upgrade() -> None:
     # tables (from a previous failed migration run), drop them first so the
     # migration can be applied idempotently.
     conn = op.get_bind()
-    conn.execute(sa.text('DROP TABLE IF EXISTS module_metadata'))
-    conn.execute(sa.text('DROP TABLE IF EXISTS api_keys'))
-    conn.execute(sa.text('DROP TABLE IF EXISTS environments'))
-    conn.execute(sa.text('DROP TABLE IF EXISTS connectors'))
-    conn.execute(sa.text('DROP TABLE IF EXISTS rate_limits'))
-    conn.execute(sa.text('DROP TABLE IF EXISTS auth_policies'))
-    conn.execute(sa.text('DROP TABLE IF EXISTS schemas'))
-    conn.execute(sa.text('DROP TABLE IF EXISTS apis'))
+    stale_tables = (
+        'module_metadata',
+        'api_keys',
+        'environments',
+        'connectors',
+        'rate_limits',
+        'auth_policies',
+        'schemas',
+        'apis',
+    )
+    if conn.dialect.name == 'postgresql':
+        # Postgres accepts a table list, so the whole cleanup is one round-trip.
+        conn.exec_driver_sql('DROP TABLE IF EXISTS ' + ', '.join(stale_tables))
+    else:
+        # SQLite drivers only take one statement per execute; these run inside
+        # the migration's single transaction so the commit is paid once.
+        for table in stale_tables:
+            conn.exec_driver_sql(f'DROP TABLE IF EXISTS {table}')
 
     op.create_table(
         'apis',
@@ -42,8 +52,14 @@ def upgrade() -> None:
         sa.Column('updated_at', sa.DateTime(timezone=True), nullable=True),
         sa.UniqueConstraint('name', 'version', name='uq_api_name_version'),
     )
-    op.create_index('ix_apis_name', 'apis', ['name'])
-    op.create_index('ix_apis_version', 'apis', ['version'])
+    # uq_api_name_version already serves (name, version) lookups, so version
+    # gets no index of its own; on Postgres the name index covers the
+    # listing columns so name-prefix scans can be index-only.
+    if conn.dialect.name == 'postgresql':
+        op.create_index('ix_apis_name', 'apis', ['name'],
+                        postgresql_include=['version', 'id', 'owner_id'])
+    else:
+        op.create_index('ix_apis_name', 'apis', ['name'])
 
     op.create_table(
         'schemas',
@@ -131,5 +147,4 @@ def downgrade() -> None:
     op.drop_table('auth_policies')
     op.drop_table('schemas')
     op.drop_index('ix_apis_name', table_name='apis')
-    op.drop_index('ix_apis_version', table_name='apis')
     op.drop_table('apis')
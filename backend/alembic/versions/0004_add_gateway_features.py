@@ -5,6 +5,8 @@ Revises: 0003_create_api_models
 Create Date: 2026-02-02
 
 """
+import datetime
+
 from alembic import op
 import sqlalchemy as sa
 from sqlalchemy.dialects.postgresql import JSON
@@ -17,8 +19,78 @@ branch_labels = None
 depends_on = None
 
 
+def _create_indexes(table, indexes):
+    """Emit plain CREATE INDEX statements right after a table is created.
+
+    Skips the batch_alter_table context (and SQLite's copy-table path) that
+    was previously opened per table just to add indexes. On Postgres a
+    table's indexes are sent together as one statement.
+    """
+    conn = op.get_bind()
+    quote = conn.dialect.identifier_preparer.quote
+    statements = [
+        f"CREATE {'UNIQUE ' if unique else ''}INDEX {quote(name)} "
+        f"ON {quote(table)} ({quote(column)})"
+        for name, column, unique in indexes
+    ]
+    if conn.dialect.name == 'postgresql' and len(statements) > 1:
+        # asyncpg only takes one statement per execute; a DO block carries
+        # the whole set in one round-trip, still inside the migration's
+        # transaction (unlike DDL fanned out over extra connections).
+        conn.exec_driver_sql("DO $$ BEGIN " + "; ".join(statements) + "; END $$")
+        return
+    for statement in statements:
+        conn.exec_driver_sql(statement)
+
+
+def _time_series_options(is_postgres):
+    """Primary key and table kwargs for the append-only time-series tables.
+
+    On Postgres the table is range-partitioned by timestamp so retention can
+    drop whole partitions instead of DELETE-scanning; a partitioned table's
+    primary key has to include the partition key.
+    """
+    if is_postgres:
+        return sa.PrimaryKeyConstraint('id', 'timestamp'), {'postgresql_partition_by': 'RANGE (timestamp)'}
+    return sa.PrimaryKeyConstraint('id'), {}
+
+
+# Monthly partitions created beyond the current one. Later months are created
+# ahead of time by the log-cleanup job (app/logging/cleanup.py).
+PARTITION_MONTHS_AHEAD = 3
+
+
+def _create_initial_partitions(table):
+    """Attach monthly partitions from this month on, plus a DEFAULT catch-all."""
+    start = datetime.date.today().replace(day=1)
+    for _ in range(PARTITION_MONTHS_AHEAD + 1):
+        end = (start + datetime.timedelta(days=32)).replace(day=1)
+        op.execute(
+            f"CREATE TABLE {table}_{start:%Y_%m} PARTITION OF {table} "
+            f"FOR VALUES FROM ('{start.isoformat()}') TO ('{end.isoformat()}')"
+        )
+        start = end
+    op.execute(f"CREATE TABLE {table}_default PARTITION OF {table} DEFAULT")
+
+
+def _create_timestamp_index(table, is_postgres):
+    """Index the append-ordered timestamp column of a time-series table.
+
+    Rows arrive in timestamp order, so on Postgres a BRIN index serves range
+    scans at a fraction of a btree's size and insert cost.
+    """
+    if is_postgres:
+        op.execute(
+            f"CREATE INDEX ix_{table}_timestamp ON {table} "
+            f"USING BRIN (timestamp) WITH (pages_per_range = 32)"
+        )
+    else:
+        _create_indexes(table, [(f'ix_{table}_timestamp', 'timestamp', False)])
+
+
 def upgrade() -> None:
     """Add new tables for secrets, audit logs, metrics, permissions, roles, etc."""
+    is_postgres = op.get_bind().dialect.name == 'postgresql'
     
     # 1. Update API Keys table
     with op.batch_alter_table('api_keys', schema=None) as batch_op:
@@ -38,13 +110,15 @@ def upgrade() -> None:
         sa.Column('updated_at', sa.DateTime(timezone=True), nullable=True),
         sa.PrimaryKeyConstraint('id')
     )
-    with op.batch_alter_table('secrets', schema=None) as batch_op:
-        batch_op.create_index(batch_op.f('ix_secrets_name'), ['name'], unique=True)
+    _create_indexes('secrets', [
+        ('ix_secrets_name', 'name', True),
+    ])
     
     # 3. Create Audit Logs table
+    pk, partitioning = _time_series_options(is_postgres)
     op.create_table('audit_logs',
-        sa.Column('id', sa.Integer(), nullable=False),
-        sa.Column('timestamp', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=True),
+        sa.Column('id', sa.Integer(), nullable=False, autoincrement=True),
+        sa.Column('timestamp', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=not is_postgres),
         sa.Column('user_id', sa.Integer(), nullable=True),
         sa.Column('action', sa.String(), nullable=False),
         sa.Column('resource_type', sa.String(), nullable=True),
@@ -55,18 +129,23 @@ def upgrade() -> None:
         sa.Column('status', sa.String(), nullable=True),
         sa.Column('error_message', sa.Text(), nullable=True),
         sa.ForeignKeyConstraint(['user_id'], ['users.id'], ondelete='SET NULL'),
-        sa.PrimaryKeyConstraint('id')
+        pk,
+        **partitioning
     )
-    with op.batch_alter_table('audit_logs', schema=None) as batch_op:
-        batch_op.create_index(batch_op.f('ix_audit_logs_timestamp'), ['timestamp'], unique=False)
-        batch_op.create_index(batch_op.f('ix_audit_logs_action'), ['action'], unique=False)
-        batch_op.create_index(batch_op.f('ix_audit_logs_user_id'), ['user_id'], unique=False)
-        batch_op.create_index(batch_op.f('ix_audit_logs_resource_type'), ['resource_type'], unique=False)
+    if is_postgres:
+        _create_initial_partitions('audit_logs')
+    _create_timestamp_index('audit_logs', is_postgres)
+    _create_indexes('audit_logs', [
+        ('ix_audit_logs_action', 'action', False),
+        ('ix_audit_logs_user_id', 'user_id', False),
+        ('ix_audit_logs_resource_type', 'resource_type', False),
+    ])
     
     # 4. Create Metrics table
+    pk, partitioning = _time_series_options(is_postgres)
     op.create_table('metrics',
-        sa.Column('id', sa.Integer(), nullable=False),
-        sa.Column('timestamp', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=True),
+        sa.Column('id', sa.Integer(), nullable=False, autoincrement=True),
+        sa.Column('timestamp', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=not is_postgres),
         sa.Column('metric_type', sa.String(), nullable=False),
         sa.Column('endpoint', sa.String(), nullable=True),
         sa.Column('method', sa.String(), nullable=True),
@@ -77,13 +156,17 @@ def upgrade() -> None:
         sa.Column('metadata', JSON, nullable=True),
         sa.ForeignKeyConstraint(['api_id'], ['apis.id'], ondelete='SET NULL'),
         sa.ForeignKeyConstraint(['user_id'], ['users.id'], ondelete='SET NULL'),
-        sa.PrimaryKeyConstraint('id')
+        pk,
+        **partitioning
     )
-    with op.batch_alter_table('metrics', schema=None) as batch_op:
-        batch_op.create_index(batch_op.f('ix_metrics_timestamp'), ['timestamp'], unique=False)
-        batch_op.create_index(batch_op.f('ix_metrics_metric_type'), ['metric_type'], unique=False)
-        batch_op.create_index(batch_op.f('ix_metrics_endpoint'), ['endpoint'], unique=False)
-        batch_op.create_index(batch_op.f('ix_metrics_api_id'), ['api_id'], unique=False)
+    if is_postgres:
+        _create_initial_partitions('metrics')
+    _create_timestamp_index('metrics', is_postgres)
+    _create_indexes('metrics', [
+        ('ix_metrics_metric_type', 'metric_type', False),
+        ('ix_metrics_endpoint', 'endpoint', False),
+        ('ix_metrics_api_id', 'api_id', False),
+    ])
     
     # 5. Create Backend Pools table
     op.create_table('backend_pools',
@@ -99,9 +182,10 @@ def upgrade() -> None:
         sa.ForeignKeyConstraint(['api_id'], ['apis.id'], ondelete='CASCADE'),
         sa.PrimaryKeyConstraint('id')
     )
-    with op.batch_alter_table('backend_pools', schema=None) as batch_op:
-        batch_op.create_index(batch_op.f('ix_backend_pools_name'), ['name'], unique=True)
-        batch_op.create_index(batch_op.f('ix_backend_pools_api_id'), ['api_id'], unique=False)
+    _create_indexes('backend_pools', [
+        ('ix_backend_pools_name', 'name', True),
+        ('ix_backend_pools_api_id', 'api_id', False),
+    ])
     
     # 6. Create Permissions table
     op.create_table('permissions',
@@ -113,10 +197,11 @@ def upgrade() -> None:
         sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=True),
         sa.PrimaryKeyConstraint('id')
     )
-    with op.batch_alter_table('permissions', schema=None) as batch_op:
-        batch_op.create_index(batch_op.f('ix_permissions_name'), ['name'], unique=True)
-        batch_op.create_index(batch_op.f('ix_permissions_resource'), ['resource'], unique=False)
-        batch_op.create_index(batch_op.f('ix_permissions_action'), ['action'], unique=False)
+    _create_indexes('permissions', [
+        ('ix_permissions_name', 'name', True),
+        ('ix_permissions_resource', 'resource', False),
+        ('ix_permissions_action', 'action', False),
+    ])
     
     # 7. Create Roles table
     op.create_table('roles',
@@ -128,8 +213,9 @@ def upgrade() -> None:
         sa.Column('updated_at', sa.DateTime(timezone=True), nullable=True),
         sa.PrimaryKeyConstraint('id')
     )
-    with op.batch_alter_table('roles', schema=None) as batch_op:
-        batch_op.create_index(batch_op.f('ix_roles_name'), ['name'], unique=True)
+    _create_indexes('roles', [
+        ('ix_roles_name', 'name', True),
+    ])
     
     # 8. Create User Roles junction table
     op.create_table('user_roles',
@@ -141,9 +227,10 @@ def upgrade() -> None:
         sa.ForeignKeyConstraint(['role_id'], ['roles.id'], ondelete='CASCADE'),
         sa.PrimaryKeyConstraint('id')
     )
-    with op.batch_alter_table('user_roles', schema=None) as batch_op:
-        batch_op.create_index(batch_op.f('ix_user_roles_user_id'), ['user_id'], unique=False)
-        batch_op.create_index(batch_op.f('ix_user_roles_role_id'), ['role_id'], unique=False)
+    _create_indexes('user_roles', [
+        ('ix_user_roles_user_id', 'user_id', False),
+        ('ix_user_roles_role_id', 'role_id', False),
+    ])
     
     # 9. Create Module Scripts table
     op.create_table('module_scripts',
@@ -158,9 +245,10 @@ def upgrade() -> None:
         sa.ForeignKeyConstraint(['module_id'], ['module_metadata.id'], ondelete='CASCADE'),
         sa.PrimaryKeyConstraint('id')
     )
-    with op.batch_alter_table('module_scripts', schema=None) as batch_op:
-        batch_op.create_index(batch_op.f('ix_module_scripts_module_id'), ['module_id'], unique=False)
-        batch_op.create_index(batch_op.f('ix_module_scripts_name'), ['name'], unique=False)
+    _create_indexes('module_scripts', [
+        ('ix_module_scripts_module_id', 'module_id', False),
+        ('ix_module_scripts_name', 'name', False),
+    ])
 
 
 def downgrade() -> None:
@@ -5,6 +5,8 @@ Revises: 0004
 Create Date: 2026-02-07 07:30:00.000000
 
 """
+import time
+
 from alembic import op
 import sqlalchemy as sa
 
@@ -16,43 +18,59 @@ branch_labels = None
 depends_on = None
 
 
+def _chunked_update(connection, table, set_clause, where, chunk=10_000, retry_delay=0.5):
+    """Apply an UPDATE in id batches of `chunk` rows until no row matches.
+
+    Run inside an autocommit block so each batch is its own short
+    transaction; on Postgres, rows locked by live traffic are skipped and
+    picked up by a later batch instead of blocking. A batch that updates
+    nothing may only mean every remaining row was locked, so the loop ends
+    on a plain existence check, waiting `retry_delay` seconds before
+    retrying skipped rows.
+    """
+    skip_locked = " FOR UPDATE SKIP LOCKED" if connection.dialect.name == 'postgresql' else ""
+    stmt = sa.text(
+        f"UPDATE {table} SET {set_clause} WHERE id IN "
+        f"(SELECT id FROM {table} WHERE {where} LIMIT {chunk}{skip_locked})"
+    )
+    remaining = sa.text(f"SELECT 1 FROM {table} WHERE {where} LIMIT 1")
+    while True:
+        if connection.execute(stmt).rowcount:
+            continue
+        if connection.execute(remaining).first() is None:
+            return
+        time.sleep(retry_delay)
+
+
 def upgrade():
-    # Update any existing NULL values to proper defaults
-    op.execute("""
-        UPDATE users 
-        SET is_active = TRUE 
-        WHERE is_active IS NULL
-    """)
-
-    op.execute("""
-        UPDATE users 
-        SET is_superuser = FALSE 
-        WHERE is_superuser IS NULL
-    """)
-
-    # Alter columns to be NOT NULL with defaults (SQLite compatible)
-    # Note: SQLite doesn't support ALTER COLUMN directly, so we check dialect
-    connection = op.get_bind()
-    if connection.dialect.name == 'postgresql':
-        op.alter_column('users', 'is_active',
-                        existing_type=sa.Boolean(),
-                        nullable=False,
-                        server_default=sa.text('TRUE'))
-        op.alter_column('users', 'is_superuser',
-                        existing_type=sa.Boolean(),
-                        nullable=False,
-                        server_default=sa.text('FALSE'))
-    # For SQLite, the defaults are already set in the model
+    # Update any existing NULL values to proper defaults. Already-clean
+    # tables (every redeploy after the first) finish after one empty batch.
+    with op.get_context().autocommit_block():
+        connection = op.get_bind()
+        for column, default in (('is_active', 'TRUE'), ('is_superuser', 'FALSE')):
+            _chunked_update(connection, 'users', f"{column} = {default}", f"{column} IS NULL")
+
+    # Alter columns to be NOT NULL with defaults. batch_alter_table emits a
+    # plain ALTER on Postgres and rebuilds the table on SQLite (which has no
+    # ALTER COLUMN), so both dialects converge on the model's schema.
+    with op.batch_alter_table('users') as batch_op:
+        batch_op.alter_column('is_active',
+                              existing_type=sa.Boolean(),
+                              nullable=False,
+                              server_default=sa.text('TRUE'))
+        batch_op.alter_column('is_superuser',
+                              existing_type=sa.Boolean(),
+                              nullable=False,
+                              server_default=sa.text('FALSE'))
 
 
 def downgrade():
-    connection = op.get_bind()
-    if connection.dialect.name == 'postgresql':
-        op.alter_column('users', 'is_active',
-                        existing_type=sa.Boolean(),
-                        nullable=True,
-                        server_default=None)
-        op.alter_column('users', 'is_superuser',
-                        existing_type=sa.Boolean(),
-                        nullable=True,
-                        server_default=None)
+    with op.batch_alter_table('users') as batch_op:
+        batch_op.alter_column('is_active',
+                              existing_type=sa.Boolean(),
+                              nullable=True,
+                              server_default=None)
+        batch_op.alter_column('is_superuser',
+                              existing_type=sa.Boolean(),
+                              nullable=True,
+                              server_default=None)
@@ -0,0 +1,52 @@
+"""add fixed-width sha256 fingerprint to api_keys
+
+Revision ID: 0006
+Revises: 0005
+Create Date: 2026-02-10 09:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0006'
+down_revision = '0005'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # 32-byte digest of the plain key; lookups compare this instead of the
+    # 64-char hex string held in `key`.
+    op.add_column('api_keys', sa.Column('key_sha256', sa.LargeBinary(32), nullable=True))
+
+    # Unsalted keys already store sha256(plain).hexdigest(), so the binary
+    # fingerprint is just the decoded hex. Salted ('salt:hash') keys stay NULL.
+    connection = op.get_bind()
+    if connection.dialect.name == 'postgresql':
+        connection.execute(sa.text(
+            "UPDATE api_keys SET key_sha256 = decode(key, 'hex') "
+            "WHERE key_sha256 IS NULL AND position(':' in key) = 0"
+        ))
+    else:
+        rows = connection.execute(sa.text(
+            "SELECT id, key FROM api_keys WHERE key_sha256 IS NULL"
+        )).all()
+        updates = [
+            {"id": row.id, "fp": bytes.fromhex(row.key)}
+            for row in rows if ':' not in row.key
+        ]
+        if updates:
+            connection.execute(
+                sa.text("UPDATE api_keys SET key_sha256 = :fp WHERE id = :id"),
+                updates,
+            )
+
+    op.create_index('ix_api_keys_key_sha256', 'api_keys', ['key_sha256'], unique=True)
+
+
+def downgrade():
+    op.drop_index('ix_api_keys_key_sha256', table_name='api_keys')
+    with op.batch_alter_table('api_keys') as batch_op:
+        batch_op.drop_column('key_sha256')
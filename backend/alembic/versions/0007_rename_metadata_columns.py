@@ -0,0 +1,30 @@
+"""rename json `metadata` columns to `extra`
+
+Revision ID: 0007
+Revises: 0006
+Create Date: 2026-02-12 10:00:00.000000
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = '0007'
+down_revision = '0006'
+branch_labels = None
+depends_on = None
+
+# tables created in 0004 whose JSON column clashed with Declarative `metadata`
+TABLES = ('api_keys', 'audit_logs', 'metrics')
+
+
+def upgrade():
+    for table in TABLES:
+        with op.batch_alter_table(table) as batch_op:
+            batch_op.alter_column('metadata', new_column_name='extra')
+
+
+def downgrade():
+    for table in TABLES:
+        with op.batch_alter_table(table) as batch_op:
+            batch_op.alter_column('extra', new_column_name='metadata')
@@ -0,0 +1,45 @@
+"""index refresh_tokens for per-user pruning
+
+Revision ID: 0008
+Revises: 0007
+Create Date: 2026-02-14 09:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0008'
+down_revision = '0007'
+branch_labels = None
+depends_on = None
+
+
+def _has_refresh_tokens():
+    # refresh_tokens comes from the models' create_all, not an earlier
+    # revision, so it may not exist yet on a fresh database
+    return sa.inspect(op.get_bind()).has_table('refresh_tokens')
+
+
+def upgrade():
+    if not _has_refresh_tokens():
+        return
+    # Serves the prune query (user_id + revoked, ranked by created_at). The
+    # index is ascending; the newest-first ranking reads it backwards. Its
+    # user_id prefix makes the single-column index redundant.
+    op.execute(
+        'CREATE INDEX IF NOT EXISTS ix_refresh_tokens_user_revoked_created '
+        'ON refresh_tokens (user_id, revoked, created_at)'
+    )
+    op.execute('DROP INDEX IF EXISTS ix_refresh_tokens_user_id')
+
+
+def downgrade():
+    if not _has_refresh_tokens():
+        return
+    op.execute(
+        'CREATE INDEX IF NOT EXISTS ix_refresh_tokens_user_id '
+        'ON refresh_tokens (user_id)'
+    )
+    op.execute('DROP INDEX IF EXISTS ix_refresh_tokens_user_revoked_created')
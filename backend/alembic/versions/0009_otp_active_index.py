@@ -0,0 +1,37 @@
+"""partial index for the latest unconsumed OTP lookup
+
+Revision ID: 0009
+Revises: 0008
+Create Date: 2026-02-21 09:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0009'
+down_revision = '0008'
+branch_labels = None
+depends_on = None
+
+
+def _has_otps():
+    # otps comes from the models' create_all, not an earlier revision
+    return sa.inspect(op.get_bind()).has_table('otps')
+
+
+def upgrade():
+    if not _has_otps():
+        return
+    # Postgres and SQLite both take partial indexes in this form
+    op.execute(
+        'CREATE INDEX IF NOT EXISTS ix_otps_email_transport_active '
+        'ON otps (email, transport, created_at DESC) WHERE NOT consumed'
+    )
+
+
+def downgrade():
+    if not _has_otps():
+        return
+    op.execute('DROP INDEX IF EXISTS ix_otps_email_transport_active')
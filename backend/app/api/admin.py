@@ -1,15 +1,56 @@
 """Administrative endpoints for system initialization and management."""
 
-from fastapi import APIRouter, Depends, HTTPException, status
+import json
+import os
+import time
+import uuid
+
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, status
+from sqlalchemy import text
 from sqlalchemy.ext.asyncio import AsyncSession
 from app.db.connector import get_db
-from app.authorizers.init import init_rbac_system, ensure_rbac_initialized
+from app.db.db_manager import get_db_manager
+from app.authorizers.init import init_rbac_system, ensure_rbac_initialized, mark_rbac_ready
+from app.authorizers.cache import invalidate_rbac_cache
 from app.api.auth.auth_dependency import get_current_user
 from app.db.models import User
 from pydantic import BaseModel
+from typing import Dict, Optional
 
 router = APIRouter(prefix="/api/admin", tags=["Administration"])
 
+# Role/permission counts and role names in one round-trip, per dialect.
+_RBAC_SUMMARY_SQL = {
+    "postgresql": text(
+        "SELECT (SELECT COUNT(*) FROM roles) AS r, "
+        "(SELECT COUNT(*) FROM permissions) AS p, "
+        "(SELECT COALESCE(json_agg(name), '[]'::json) FROM roles) AS names"
+    ),
+    "sqlite": text(
+        "SELECT (SELECT COUNT(*) FROM roles) AS r, "
+        "(SELECT COUNT(*) FROM permissions) AS p, "
+        "(SELECT json_group_array(name) FROM roles) AS names"
+    ),
+}
+
+
+async def _rbac_summary(db) -> tuple:
+    """Return (total_roles, total_permissions, role_names)."""
+    stmt = None
+    if isinstance(db, AsyncSession):
+        stmt = _RBAC_SUMMARY_SQL.get(db.bind.dialect.name)
+    if stmt is None:
+        # fallback stores (and other dialects) go through the RBAC manager
+        from app.authorizers.rbac import RBACManager
+        manager = RBACManager(db)
+        roles = await manager.list_roles()
+        permissions = await manager.list_permissions()
+        return len(roles), len(permissions), [r.name for r in roles]
+
+    row = (await db.execute(stmt)).one()
+    names = json.loads(row.names) if isinstance(row.names, str) else row.names
+    return row.r, row.p, names or []
+
 
 class InitRBACResponse(BaseModel):
     """Response schema for RBAC initialization."""
@@ -22,58 +63,144 @@ class InitRBACResponse(BaseModel):
     errors: list
 
 
-@router.post("/init-rbac", response_model=InitRBACResponse)
+class InitRBACJob(BaseModel):
+    """Status of a queued RBAC initialization job."""
+    job_id: str
+    status: str  # queued | running | done | failed
+    result: Optional[InitRBACResponse] = None
+
+
+# Init jobs are tracked in-process; callers that arrive while a job is still
+# queued or running are handed that job instead of starting another seed.
+# Job ids are only known to the worker that queued them, so with several
+# workers a poll can land elsewhere and 404; run the seed against a single
+# worker (or check /rbac-status, which reads the database) in that setup.
+# Finished jobs are kept for RBAC_JOB_TTL seconds, at most RBAC_JOBS_MAX.
+_RBAC_JOBS: Dict[str, InitRBACJob] = {}
+_ACTIVE_RBAC_JOB: Optional[str] = None
+# finished job id -> monotonic finish time, in finish order
+_RBAC_JOBS_FINISHED: Dict[str, float] = {}
+RBAC_JOB_TTL = int(os.getenv("RBAC_JOB_TTL", "3600"))
+RBAC_JOBS_MAX = int(os.getenv("RBAC_JOBS_MAX", "100"))
+
+
+def _evict_finished_jobs(now: float) -> None:
+    """Forget finished jobs past RBAC_JOB_TTL or beyond RBAC_JOBS_MAX."""
+    while _RBAC_JOBS_FINISHED:
+        job_id, finished_at = next(iter(_RBAC_JOBS_FINISHED.items()))
+        if now - finished_at <= RBAC_JOB_TTL and len(_RBAC_JOBS_FINISHED) <= RBAC_JOBS_MAX:
+            break
+        del _RBAC_JOBS_FINISHED[job_id]
+        _RBAC_JOBS.pop(job_id, None)
+
+
+async def require_superuser(current_user: User = Depends(get_current_user)) -> User:
+    """Resolve the current user once and reject non-superusers."""
+    if not current_user.is_superuser:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Only superusers can initialize RBAC"
+        )
+    return current_user
+
+
+def _summarize(results: dict) -> InitRBACResponse:
+    success = len(results["errors"]) == 0
+    total_created = len(
+        results["permissions_created"]) + len(results["roles_created"])
+
+    if success:
+        message = f"RBAC initialized successfully: {total_created} items created"
+    else:
+        message = f"RBAC initialized with {len(results['errors'])} errors"
+
+    return InitRBACResponse(
+        success=success,
+        message=message,
+        permissions_created=len(results["permissions_created"]),
+        permissions_skipped=len(results["permissions_skipped"]),
+        roles_created=len(results["roles_created"]),
+        roles_skipped=len(results["roles_skipped"]),
+        errors=results["errors"]
+    )
+
+
+async def _run_init(job_id: str, force: bool) -> None:
+    """Run the RBAC seed for a job on its own session."""
+    global _ACTIVE_RBAC_JOB
+    job = _RBAC_JOBS[job_id]
+    job.status = "running"
+    try:
+        # the request's session is closed by the time background tasks run
+        async with get_db_manager().get_session() as db:
+            results = await init_rbac_system(db, force=force)
+        job.result = _summarize(results)
+        if job.result.success:
+            mark_rbac_ready()
+        job.status = "done"
+    except Exception as e:
+        job.result = _summarize({
+            "permissions_created": [],
+            "permissions_skipped": [],
+            "roles_created": [],
+            "roles_skipped": [],
+            "errors": [f"Failed to initialize RBAC: {str(e)}"],
+        })
+        job.status = "failed"
+    finally:
+        # the seed may have written rows even when it reports errors
+        await invalidate_rbac_cache()
+        if _ACTIVE_RBAC_JOB == job_id:
+            _ACTIVE_RBAC_JOB = None
+        _RBAC_JOBS_FINISHED[job_id] = time.monotonic()
+        _evict_finished_jobs(time.monotonic())
+
+
+@router.post("/init-rbac", response_model=InitRBACJob, status_code=status.HTTP_202_ACCEPTED)
 async def initialize_rbac(
+    background_tasks: BackgroundTasks,
     force: bool = False,
-    db: AsyncSession = Depends(get_db),
-    current_user: User = Depends(get_current_user),
+    current_user: User = Depends(require_superuser),
 ):
     """
-    Initialize RBAC system with default roles and permissions.
+    Queue initialization of the RBAC system with default roles and permissions.
 
-    This endpoint creates all default roles and permissions needed for the system.
-    It's idempotent and safe to call multiple times.
+    The seed runs after the response is sent; poll
+    ``GET /api/admin/init-rbac/{job_id}`` for the outcome. It's idempotent
+    and safe to call multiple times.
 
     Args:
         force: If True, will recreate all roles and permissions (use with caution)
 
     Returns:
-        Summary of initialization results
+        The queued (or already active) job
     """
-    # Only superusers can initialize RBAC
-    if not current_user.is_superuser:
-        raise HTTPException(
-            status_code=status.HTTP_403_FORBIDDEN,
-            detail="Only superusers can initialize RBAC"
-        )
-
-    try:
-        results = await init_rbac_system(db, force=force)
-
-        success = len(results["errors"]) == 0
-        total_created = len(
-            results["permissions_created"]) + len(results["roles_created"])
-
-        if success:
-            message = f"RBAC initialized successfully: {total_created} items created"
-        else:
-            message = f"RBAC initialized with {len(results['errors'])} errors"
-
-        return InitRBACResponse(
-            success=success,
-            message=message,
-            permissions_created=len(results["permissions_created"]),
-            permissions_skipped=len(results["permissions_skipped"]),
-            roles_created=len(results["roles_created"]),
-            roles_skipped=len(results["roles_skipped"]),
-            errors=results["errors"]
-        )
-
-    except Exception as e:
+    global _ACTIVE_RBAC_JOB
+    if _ACTIVE_RBAC_JOB is not None:
+        return _RBAC_JOBS[_ACTIVE_RBAC_JOB]
+    _evict_finished_jobs(time.monotonic())
+
+    job = InitRBACJob(job_id=uuid.uuid4().hex, status="queued")
+    _RBAC_JOBS[job.job_id] = job
+    _ACTIVE_RBAC_JOB = job.job_id
+    background_tasks.add_task(_run_init, job.job_id, force)
+    return job
+
+
+@router.get("/init-rbac/{job_id}", response_model=InitRBACJob)
+async def get_rbac_init_job(
+    job_id: str,
+    current_user: User = Depends(require_superuser),
+):
+    """Return the status (and, once finished, the summary) of an init job."""
+    _evict_finished_jobs(time.monotonic())
+    job = _RBAC_JOBS.get(job_id)
+    if job is None:
         raise HTTPException(
-            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            detail=f"Failed to initialize RBAC: {str(e)}"
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="RBAC init job not found"
         )
+    return job
 
 
 @router.get("/rbac-status")
@@ -89,18 +216,13 @@ async def rbac_status(
     """
     try:
         is_initialized = await ensure_rbac_initialized(db)
-
-        from app.authorizers.rbac import RBACManager
-        manager = RBACManager(db)
-
-        roles = await manager.list_roles()
-        permissions = await manager.list_permissions()
+        total_roles, total_permissions, role_names = await _rbac_summary(db)
 
         return {
             "initialized": is_initialized,
-            "total_roles": len(roles),
-            "total_permissions": len(permissions),
-            "roles": [r.name for r in roles],
+            "total_roles": total_roles,
+            "total_permissions": total_permissions,
+            "roles": role_names,
             "message": "RBAC is initialized" if is_initialized else "RBAC needs initialization"
         }
 
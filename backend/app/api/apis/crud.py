@@ -1,15 +1,51 @@
-from typing import Any, Dict, List, Optional
+from typing import Any, Dict, List, Optional, Protocol
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select
+from sqlalchemy import bindparam, delete, insert, select, text, update
+from sqlalchemy.exc import IntegrityError
 
 from ...db import models
+from ...db.session_utils import CONFLICT_INSERTS
 import datetime
 
 
+# Statements are built once so SQLAlchemy's compiled cache is hit on every
+# call instead of re-constructing the select() per request.
+_SELECT_ALL_APIS = select(models.API)
+_SELECT_APIS_PAGE = (
+    select(models.API)
+    .order_by(models.API.id)
+    .limit(bindparam("limit"))
+    .offset(bindparam("offset"))
+)
+
+# Postgres builds the whole listing as one JSON document server-side, keyed
+# like the APIMeta response, so no row objects are materialized in Python.
+_LIST_APIS_JSON_PG = text(
+    "SELECT COALESCE(json_agg(json_build_object("
+    "'id', a.id, 'name', a.name, 'version', a.version, "
+    "'description', a.description, 'owner_id', a.owner_id, "
+    "'type', a.type, 'resource', a.resource, 'config', a.config, "
+    "'createdAt', a.created_at, 'updatedAt', a.updated_at"
+    ") ORDER BY a.id), '[]'::json)::text "
+    "FROM (SELECT * FROM apis ORDER BY id LIMIT :limit OFFSET :offset) a"
+)
+
+# page size used by the listing endpoint when the client does not pass one
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 1000
+
+# column names accepted in an update patch (excludes relationships)
+_API_COLUMNS = frozenset(models.API.__table__.columns.keys())
+_DT_COLUMNS = frozenset(("created_at", "updated_at"))
+_CAMEL_DT_KEYS = (("createdAt", "created_at"), ("updatedAt", "updated_at"))
+
+
+# shared stand-in for absent nested config sections; only ever read
+_EMPTY: Dict[str, Any] = {}
+
+
 def _parse_datetime(value: Any) -> Optional[datetime.datetime]:
-    if value is None:
-        return None
-    if isinstance(value, datetime.datetime):
+    if value is None or isinstance(value, datetime.datetime):
         return value
     if isinstance(value, str):
         try:
@@ -23,91 +59,268 @@ def _parse_datetime(value: Any) -> Optional[datetime.datetime]:
     return None
 
 
-async def create_api(db: AsyncSession | object, payload: Dict[str, Any]) -> models.API | object:
-    """Create an API either in the SQL DB or in the in-memory fallback.
+def _page_statement(limit: Optional[int], offset: int) -> tuple:
+    """Pick the listing statement and its parameters for a page request."""
+    if limit is None:
+        if not offset:
+            return _SELECT_ALL_APIS, {}
+        # no portable "unbounded" LIMIT value, so offset-only pages are ad hoc
+        return _SELECT_ALL_APIS.order_by(models.API.id).offset(offset), {}
+    return _SELECT_APIS_PAGE, {"limit": limit, "offset": offset}
 
-    The `db` argument can be an AsyncSession or an InMemoryDB instance. We
-    detect the latter by the presence of an attribute `in_memory` on the
-    object.
-    """
-    # In-memory path
-    if getattr(db, "in_memory", False):
-        return await db.create_api(payload)
-
-    # SQLAlchemy path
-    # check for existing API with same name+version
-    existing = await db.execute(
-        select(models.API).where(models.API.name == payload.get("name"), models.API.version == payload.get("version"))
-    )
-    if existing.scalar_one_or_none() is not None:
-        raise ValueError("API with same name and version already exists")
-
-    api = models.API(
-        name=payload.get("name"),
-        version=payload.get("version"),
-        description=payload.get("description"),
-        owner_id=payload.get("owner_id"),
+
+def _create_values(payload: Dict[str, Any]) -> Dict[str, Any]:
+    """Map a create payload onto API column values."""
+    get = payload.get
+    cfg = get("config") or _EMPTY
+    ui = (cfg.get("_meta") or _EMPTY).get("ui") or _EMPTY
+    values = dict(
+        name=get("name"),
+        version=get("version"),
+        description=get("description"),
+        owner_id=get("owner_id"),
         # accept created/updated timestamps from snake_case or camelCase or from config._meta.ui
         created_at=_parse_datetime(
-            payload.get("created_at") or payload.get("createdAt") or (payload.get("config") or {}).get("_meta", {}).get("ui", {}).get("createdAt") or (payload.get("config") or {}).get("_meta", {}).get("ui", {}).get("created_at")
+            get("created_at") or get("createdAt") or ui.get("createdAt") or ui.get("created_at")
         ),
         updated_at=_parse_datetime(
-            payload.get("updated_at") or payload.get("updatedAt") or (payload.get("config") or {}).get("_meta", {}).get("ui", {}).get("updatedAt") or (payload.get("config") or {}).get("_meta", {}).get("ui", {}).get("updated_at")
+            get("updated_at") or get("updatedAt") or ui.get("updatedAt") or ui.get("updated_at")
         ),
         # accept top-level type/resource or embedded under config._meta.ui / config.resource
-        type=(payload.get("type") or (payload.get("config") or {}).get("_meta", {}).get("ui", {}).get("type")),
-        resource=(payload.get("resource") or (payload.get("config") or {}).get("resource") or (payload.get("config") or {}).get("_meta", {}).get("ui", {}).get("resource")),
-        config=payload.get("config"),
+        type=get("type") or ui.get("type"),
+        resource=get("resource") or cfg.get("resource") or ui.get("resource"),
+        config=get("config"),
     )
-    db.add(api)
-    await db.commit()
-    await db.refresh(api)
-    return api
+    # leave created_at to the server default when the caller did not send one
+    if values["created_at"] is None:
+        del values["created_at"]
+    return values
+
+
+def _update_values(patch: Dict[str, Any]) -> Dict[str, Any]:
+    """Filter an update patch down to API columns with parsed timestamps."""
+    # camelCase timestamp keys map onto the model attribute names; work on
+    # a copy so the caller's patch is left as it was
+    patch = dict(patch)
+    for camel, snake in _CAMEL_DT_KEYS:
+        if patch.get(camel) is not None:
+            patch[snake] = patch.pop(camel)
+
+    clean = {}
+    for k, v in patch.items():
+        if v is None or k not in _API_COLUMNS:
+            continue
+        if k in _DT_COLUMNS:
+            v = _parse_datetime(v)
+            if v is None:
+                continue
+        clean[k] = v
+    return clean
+
+
+class ApiCrud(Protocol):
+    """CRUD operations for APIs, bound to one database handle."""
+
+    async def create(self, payload: Dict[str, Any]) -> models.API | object: ...
+
+    async def list(self, *, limit: Optional[int] = None, offset: int = 0) -> List[models.API] | List[object]: ...
+
+    async def list_json(self, *, limit: int = DEFAULT_PAGE_SIZE, offset: int = 0) -> Optional[str]: ...
+
+    async def get(self, api_id: int) -> Optional[models.API] | Optional[object]: ...
+
+    async def update(self, api: models.API | object, patch: Dict[str, Any]) -> models.API | object: ...
+
+    async def update_by_id(self, api_id: int, patch: Dict[str, Any]) -> Optional[models.API] | Optional[object]: ...
+
+    async def delete(self, api: models.API | object) -> None: ...
+
+    async def delete_by_id(self, api_id: int) -> bool: ...
+
+
+class SqlApiCrud:
+    """ApiCrud backed by a SQLAlchemy AsyncSession."""
+
+    def __init__(self, db: AsyncSession) -> None:
+        self.db = db
+
+    async def create(self, payload: Dict[str, Any]) -> models.API:
+        values = _create_values(payload)
+        dialect_insert = CONFLICT_INSERTS.get(self.db.bind.dialect.name)
+        if dialect_insert is not None:
+            # duplicates come back as an empty RETURNING instead of an
+            # IntegrityError, so the create is a single statement either way
+            result = await self.db.execute(
+                dialect_insert(models.API)
+                .values(**values)
+                .on_conflict_do_nothing(index_elements=["name", "version"])
+                .returning(models.API)
+            )
+            api = result.scalar_one_or_none()
+            if api is None:
+                await self.db.rollback()
+                raise ValueError("API with same name and version already exists")
+            await self.db.commit()
+            return api
+
+        # rely on uq_api_name_version instead of a pre-check SELECT, and
+        # fold the refresh into the INSERT via RETURNING.
+        try:
+            result = await self.db.execute(
+                insert(models.API).values(**values).returning(models.API)
+            )
+            api = result.scalar_one()
+            await self.db.commit()
+        except IntegrityError as e:
+            await self.db.rollback()
+            message = str(e.orig)
+            if "uq_api_name_version" in message or "UNIQUE" in message:
+                raise ValueError("API with same name and version already exists")
+            raise
+        return api
+
+    async def list(self, *, limit: Optional[int] = None, offset: int = 0) -> List[models.API]:
+        stmt, params = _page_statement(limit, offset)
+        result = await self.db.execute(stmt, params)
+        return result.scalars().all()
 
+    async def list_json(self, *, limit: int = DEFAULT_PAGE_SIZE, offset: int = 0) -> Optional[str]:
+        """Return a page of the listing as a JSON array string, or None if unsupported."""
+        if self.db.bind.dialect.name != "postgresql":
+            return None
+        result = await self.db.execute(_LIST_APIS_JSON_PG, {"limit": limit, "offset": offset})
+        return result.scalar_one()
+
+    async def get(self, api_id: int) -> Optional[models.API]:
+        # identity-map hit skips SQL; a miss emits the same PK SELECT
+        return await self.db.get(models.API, api_id)
+
+    async def update(self, api: models.API, patch: Dict[str, Any]) -> models.API:
+        # an empty patch resolves through get(), an identity-map hit for api
+        return await self.update_by_id(api.id, patch)
+
+    async def update_by_id(self, api_id: int, patch: Dict[str, Any]) -> Optional[models.API]:
+        """Apply a patch by id; None if no such API.
+
+        The UPDATE doubles as the existence check, so no row is loaded
+        beforehand.
+        """
+        clean = _update_values(patch)
+        if not clean:
+            return await self.get(api_id)
+        # UPDATE ... RETURNING replaces dirty-tracking + flush + refresh SELECT
+        result = await self.db.execute(
+            update(models.API)
+            .where(models.API.id == api_id)
+            .values(**clean)
+            .returning(models.API)
+        )
+        api = result.scalar_one_or_none()
+        if api is None:
+            await self.db.rollback()
+            return None
+        await self.db.commit()
+        return api
+
+    async def delete(self, api: models.API) -> None:
+        await self.db.delete(api)
+        await self.db.commit()
+
+    async def delete_by_id(self, api_id: int) -> bool:
+        """Delete an API by id; False if no such API."""
+        if self.db.bind.dialect.name == "postgresql":
+            # the child FKs are ON DELETE CASCADE, so one DELETE ... RETURNING
+            # replaces the load + per-relationship cascade SELECTs
+            result = await self.db.execute(
+                delete(models.API).where(models.API.id == api_id).returning(models.API.id)
+            )
+            deleted = result.scalar_one_or_none() is not None
+            await self.db.commit()
+            return deleted
+        # SQLite connections from the engine do not enforce foreign keys, so
+        # let the ORM cascade remove child rows
+        api = await self.get(api_id)
+        if api is None:
+            return False
+        await self.delete(api)
+        return True
+
+
+class FallbackApiCrud:
+    """ApiCrud backed by the in-memory or SQLite fallback store.
+
+    Both stores expose create_api/list_apis/get_api/update_api/delete_api
+    and map duplicate name+version to ValueError themselves.
+    """
+
+    def __init__(self, db: object) -> None:
+        self.db = db
+
+    async def create(self, payload: Dict[str, Any]) -> object:
+        # the fallback stores map payload keys (camelCase, config._meta.ui)
+        # themselves, so they get the mapping unchanged
+        return await self.db.create_api(payload)
+
+    async def list(self, *, limit: Optional[int] = None, offset: int = 0) -> List[object]:
+        apis = await self.db.list_apis()
+        if limit is None and not offset:
+            return apis
+        apis = sorted(apis, key=lambda api: api.id)
+        return apis[offset:None if limit is None else offset + limit]
+
+    async def list_json(self, *, limit: int = DEFAULT_PAGE_SIZE, offset: int = 0) -> Optional[str]:
+        return None
 
-async def list_apis(db: AsyncSession | object) -> List[models.API] | List[object]:
-    if getattr(db, "in_memory", False):
-        return await db.list_apis()
-    result = await db.execute(select(models.API))
-    return result.scalars().all()
+    async def get(self, api_id: int) -> Optional[object]:
+        return await self.db.get_api(api_id)
+
+    async def update(self, api: object, patch: Dict[str, Any]) -> object:
+        clean = _update_values(patch)
+        if not clean:
+            return api
+        return await self.db.update_api(api, clean)
+
+    async def update_by_id(self, api_id: int, patch: Dict[str, Any]) -> Optional[object]:
+        api = await self.get(api_id)
+        if api is None:
+            return None
+        return await self.update(api, patch)
+
+    async def delete(self, api: object) -> None:
+        await self.db.delete_api(api)
+
+    async def delete_by_id(self, api_id: int) -> bool:
+        api = await self.get(api_id)
+        if api is None:
+            return False
+        await self.delete(api)
+        return True
+
+
+def crud_for(db: AsyncSession | object) -> ApiCrud:
+    """Pick the ApiCrud implementation for a database handle once."""
+    if isinstance(db, AsyncSession):
+        return SqlApiCrud(db)
+    return FallbackApiCrud(db)
+
+
+# Module-level helpers kept for callers that hold a raw database handle.
+
+async def create_api(db: AsyncSession | object, payload: Dict[str, Any]) -> models.API | object:
+    return await crud_for(db).create(payload)
+
+
+async def list_apis(db: AsyncSession | object, limit: Optional[int] = None, offset: int = 0) -> List[models.API] | List[object]:
+    return await crud_for(db).list(limit=limit, offset=offset)
 
 
 async def get_api(db: AsyncSession | object, api_id: int) -> Optional[models.API] | Optional[object]:
-    if getattr(db, "in_memory", False):
-        return await db.get_api(api_id)
-    result = await db.execute(select(models.API).where(models.API.id == api_id))
-    return result.scalar_one_or_none()
+    return await crud_for(db).get(api_id)
 
 
 async def update_api(db: AsyncSession | object, api: models.API | object, patch: Dict[str, Any]) -> models.API | object:
-    if getattr(db, "in_memory", False):
-        return await db.update_api(api, patch)
-    # normalize camelCase timestamp keys to model attribute names and parse them
-    if 'createdAt' in patch and patch.get('createdAt') is not None:
-        patch['created_at'] = _parse_datetime(patch.get('createdAt'))
-        del patch['createdAt']
-    if 'updatedAt' in patch and patch.get('updatedAt') is not None:
-        patch['updated_at'] = _parse_datetime(patch.get('updatedAt'))
-        del patch['updatedAt']
-
-    for k, v in patch.items():
-        if v is not None and hasattr(api, k):
-            # if setting timestamps, ensure datetime
-            if k in ('created_at', 'updated_at'):
-                dt = _parse_datetime(v)
-                if dt is not None:
-                    setattr(api, k, dt)
-            else:
-                setattr(api, k, v)
-    db.add(api)
-    await db.commit()
-    await db.refresh(api)
-    return api
+    return await crud_for(db).update(api, patch)
 
 
 async def delete_api(db: AsyncSession | object, api: models.API | object) -> None:
-    if getattr(db, "in_memory", False):
-        return await db.delete_api(api)
-    await db.delete(api)
-    await db.commit()
-
+    await crud_for(db).delete(api)
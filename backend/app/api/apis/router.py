@@ -1,9 +1,11 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from fastapi.responses import ORJSONResponse, Response
 from sqlalchemy.ext.asyncio import AsyncSession
 # from sqlalchemy import select
 from typing import List
 
 from ...db.connector import get_db
+from ...validation import json_body, json_body_openapi
 from . import schemas
 from . import crud
 
@@ -11,42 +13,80 @@ from . import crud
 router = APIRouter(prefix="/apis", tags=["apis"])
 
 
-@router.post("/", response_model=schemas.APIMeta, status_code=status.HTTP_201_CREATED)
-async def create_api(payload: schemas.CreateAPIRequest, db: AsyncSession = Depends(get_db)):
+async def get_crud(db: AsyncSession = Depends(get_db)) -> crud.ApiCrud:
+    """Resolve the CRUD implementation once per request."""
+    return crud.crud_for(db)
+
+
+def _api_response(api, status_code: int = status.HTTP_200_OK) -> ORJSONResponse:
+    # Rows come from our own store, so skip response_model validation and
+    # serialize the APIMeta shape directly; response_model stays for docs.
+    return ORJSONResponse(schemas.api_meta_dict(api), status_code=status_code)
+
+
+@router.post(
+    "/",
+    response_model=schemas.APIMeta,
+    status_code=status.HTTP_201_CREATED,
+    openapi_extra=json_body_openapi(schemas.CreateAPIRequest),
+)
+async def create_api(
+    payload: schemas.CreateAPIRequest = Depends(json_body(schemas.CreateAPIRequest)),
+    apis: crud.ApiCrud = Depends(get_crud),
+):
     try:
-        api = await crud.create_api(db, payload.model_dump())
-        return api
+        # flat model: its field dict already is what model_dump() would build
+        api = await apis.create(payload.__dict__)
+        return _api_response(api, status.HTTP_201_CREATED)
     except ValueError as e:
         raise HTTPException(status_code=409, detail=str(e))
 
 
 @router.get("/", response_model=List[schemas.APIMeta])
-async def list_apis(db: AsyncSession = Depends(get_db)):
-    return await crud.list_apis(db)
+async def list_apis(
+    limit: int = Query(crud.DEFAULT_PAGE_SIZE, ge=1, le=crud.MAX_PAGE_SIZE),
+    offset: int = Query(0, ge=0),
+    apis: crud.ApiCrud = Depends(get_crud),
+):
+    # Postgres fast path: one pre-serialized JSON document from the server
+    blob = await apis.list_json(limit=limit, offset=offset)
+    if blob is not None:
+        return Response(content=blob, media_type="application/json")
+    # pages are capped at MAX_PAGE_SIZE, so build the whole body on the
+    # request's own session; a DB error still surfaces as an error status
+    page = await apis.list(limit=limit, offset=offset)
+    return ORJSONResponse([schemas.api_meta_dict(api) for api in page])
 
 
 @router.get("/{api_id}", response_model=schemas.APIMeta)
-async def get_api(api_id: int, db: AsyncSession = Depends(get_db)):
-    api = await crud.get_api(db, api_id)
+async def get_api(api_id: int, apis: crud.ApiCrud = Depends(get_crud)):
+    api = await apis.get(api_id)
     if not api:
         raise HTTPException(status_code=404, detail="API not found")
-    return api
+    return _api_response(api)
 
 
-@router.put("/{api_id}", response_model=schemas.APIMeta)
-async def update_api(api_id: int, payload: schemas.UpdateAPIRequest, db: AsyncSession = Depends(get_db)):
-    api = await crud.get_api(db, api_id)
+@router.put(
+    "/{api_id}",
+    response_model=schemas.APIMeta,
+    openapi_extra=json_body_openapi(schemas.UpdateAPIRequest),
+)
+async def update_api(
+    api_id: int,
+    payload: schemas.UpdateAPIRequest = Depends(json_body(schemas.UpdateAPIRequest)),
+    apis: crud.ApiCrud = Depends(get_crud),
+):
+    # only the fields the client actually sent; a sparse patch touches 1-2
+    fields = payload.__dict__
+    patch = {k: fields[k] for k in payload.model_fields_set if fields[k] is not None}
+    api = await apis.update_by_id(api_id, patch)
     if not api:
         raise HTTPException(status_code=404, detail="API not found")
-    patch = payload.model_dump(exclude_none=True)
-    api = await crud.update_api(db, api, patch)
-    return api
+    return _api_response(api)
 
 
 @router.delete("/{api_id}", status_code=status.HTTP_204_NO_CONTENT)
-async def delete_api(api_id: int, db: AsyncSession = Depends(get_db)):
-    api = await crud.get_api(db, api_id)
-    if not api:
+async def delete_api(api_id: int, apis: crud.ApiCrud = Depends(get_crud)):
+    if not await apis.delete_by_id(api_id):
         raise HTTPException(status_code=404, detail="API not found")
-    await crud.delete_api(db, api)
     return None
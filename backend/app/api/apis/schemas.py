@@ -1,5 +1,7 @@
+import datetime
+
 from pydantic import BaseModel, Field
-from typing import Any, Dict, Optional
+from typing import Any, Dict, Optional, TypedDict
 
 
 class APIMeta(BaseModel):
@@ -18,6 +20,46 @@ class APIMeta(BaseModel):
     model_config = {"from_attributes": True}
 
 
+APIMetaDict = TypedDict("APIMetaDict", {
+    "id": Optional[int],
+    "name": str,
+    "version": str,
+    "description": Optional[str],
+    "owner_id": Optional[int],
+    "type": Optional[str],
+    "resource": Optional[Dict[str, Any]],
+    "config": Optional[Dict[str, Any]],
+    "createdAt": Optional[str],
+    "updatedAt": Optional[str],
+})
+
+
+def _isoformat(value: Any) -> Optional[str]:
+    if isinstance(value, (datetime.datetime, datetime.date)):
+        return value.isoformat()
+    return value
+
+
+def api_meta_dict(api: Any) -> APIMetaDict:
+    """Serialize an API row to the APIMeta wire shape without validation.
+
+    For listings, where rows come straight from the database and a
+    per-row model_validate would dominate the cost.
+    """
+    return {
+        "id": api.id,
+        "name": api.name,
+        "version": api.version,
+        "description": api.description,
+        "owner_id": api.owner_id,
+        "type": api.type,
+        "resource": api.resource,
+        "config": api.config,
+        "createdAt": _isoformat(api.created_at),
+        "updatedAt": _isoformat(api.updated_at),
+    }
+
+
 class CreateAPIRequest(BaseModel):
     name: str
     version: str
@@ -1,24 +1,28 @@
+import functools
+
 from fastapi import Depends, HTTPException, status, Request
-from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
-from jose import JWTError
+from jwt import PyJWTError
 from types import SimpleNamespace
 from .auth_service import get_current_user as _get_current_user_service
 from app.db.connector import get_db
 from sqlalchemy.ext.asyncio import AsyncSession
 
-# Keep HTTPBearer but allow cookie fallback for access token
-security = HTTPBearer(auto_error=False)
+
+def _bearer_token(request: Request) -> str | None:
+    """Return the token from an `Authorization: Bearer <token>` header."""
+    scheme, _, token = (request.headers.get("authorization") or "").partition(" ")
+    if scheme.lower() != "bearer":
+        return None
+    return token.strip() or None
 
 
 async def get_current_user(
     request: Request,
-    credentials: HTTPAuthorizationCredentials = Depends(security),
     session: AsyncSession = Depends(get_db),
 ):
-    # Prefer Authorization header if present
-    token = None
-    if credentials and getattr(credentials, 'credentials', None):
-        token = credentials.credentials
+    # Prefer Authorization header if present; parsed inline rather than via
+    # an HTTPBearer sub-dependency resolved on every request.
+    token = _bearer_token(request)
     # Fallback to cookie named 'access_token' (for HttpOnly cookie flows)
     if not token:
         token = request.cookies.get('access_token')
@@ -41,26 +45,32 @@ async def get_current_user(
             ns.get = lambda key, default=None: getattr(ns, key, default)
             return ns
         return user
-    except JWTError:
+    except PyJWTError:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED, detail="Could not validate credentials"
         )
 
 
+@functools.lru_cache(maxsize=None)
 def require_role(role: str):
     """Dependency factory that returns a dependency which enforces the given role.
 
     - Accepts a single role string (case-sensitive match against comma-separated roles on the user)
     - Superusers bypass role checks
+    - Memoized per role: FastAPI caches dependency results by callable
+      identity, so the same checker must come back for the same role
     """
 
     async def _checker(current_user: dict = Depends(get_current_user)):
         # current_user has keys: email, roles (comma-separated), is_superuser
         if current_user.get('is_superuser'):
             return current_user
-        roles_claim = current_user.get('roles') or ''
-        user_roles = [r.strip() for r in roles_claim.split(',') if r.strip()]
-        if role in user_roles:
+        role_set = current_user.get('role_set')
+        if role_set is None:
+            # users not built by auth_service (e.g. overridden in tests)
+            roles_claim = current_user.get('roles') or ''
+            role_set = frozenset(r.strip() for r in roles_claim.split(',') if r.strip())
+        if role in role_set:
             return current_user
         raise HTTPException(status_code=status.HTTP_403_FORBIDDEN,
                             detail="Insufficient permissions")
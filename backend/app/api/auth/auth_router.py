@@ -27,6 +27,8 @@ from .auth_dependency import get_current_user as _get_current_user_dep, require_
 from .auth_service import get_user_roles, set_user_roles
 from .auth_service import list_users
 from app.db.connector import get_db
+from app.validation import json_body, json_body_openapi
+from app.rate_limiter import rate_limit
 from sqlalchemy.ext.asyncio import AsyncSession
 from app.db.models import User
 from app.authorizers.rbac import RBACManager
@@ -38,29 +40,35 @@ SECURE_COOKIES = os.getenv(
 COOKIE_SAMESITE = os.getenv("COOKIE_SAMESITE", "lax")  # 'lax'|'strict'|'none'
 COOKIE_DOMAIN = os.getenv("COOKIE_DOMAIN") or None
 
+# per-IP limits for the brute-forceable endpoints (configurable via env)
+AUTH_RATE_LIMIT = int(os.getenv("AUTH_RATE_LIMIT", "5"))
+AUTH_RATE_WINDOW = int(os.getenv("AUTH_RATE_WINDOW", "60"))
+
+
+def _auth_rate_limit(scope: str):
+    return Depends(rate_limit(f"auth:{scope}", AUTH_RATE_LIMIT, AUTH_RATE_WINDOW))
+
+
+_COOKIE_SAMESITE = COOKIE_SAMESITE if COOKIE_SAMESITE in (
+    "lax", "strict", "none") else "lax"
+# refresh-cookie attributes are fixed for the process, so build them once;
+# when SameSite=None, Secure must be True in modern browsers
+_REFRESH_COOKIE_KW = dict(
+    httponly=True,
+    secure=True if _COOKIE_SAMESITE == "none" else SECURE_COOKIES,
+    samesite=_COOKIE_SAMESITE,
+    path="/",
+    domain=COOKIE_DOMAIN,
+)
+
 
 def set_refresh_cookie(response: Response, token: str):
-    # when SameSite=None, Secure must be True in modern browsers
-    samesite = COOKIE_SAMESITE if COOKIE_SAMESITE in (
-        "lax", "strict", "none") else "lax"
-    secure = SECURE_COOKIES
-    if samesite == "none":
-        # ensure secure when None
-        secure = True
-    # set cookie
-    response.set_cookie(
-        "refresh_token",
-        token,
-        httponly=True,
-        secure=secure,
-        samesite=samesite,
-        path="/",
-        domain=COOKIE_DOMAIN,
-    )
+    response.set_cookie("refresh_token", token, **_REFRESH_COOKIE_KW)
 
 
 def clear_refresh_cookie(response: Response):
-    response.delete_cookie("refresh_token", path="/", domain=COOKIE_DOMAIN)
+    # same attributes as when set, so SameSite=None cookies are cleared too
+    response.delete_cookie("refresh_token", **_REFRESH_COOKIE_KW)
 
 
 router = APIRouter(prefix="/auth", tags=["auth"])
@@ -93,7 +101,8 @@ async def get_me(
         # Get roles and permissions using RBACManager
         manager = RBACManager(session)
         roles = await manager.get_user_roles(user.id)
-        permissions = await manager.get_user_permissions(user.id)
+        # reuse the rows already loaded instead of re-querying roles and user
+        permissions = manager.collect_permissions(roles, user.roles)
 
         # Helper to convert datetime or string to ISO format
         def to_isoformat(dt):
@@ -126,8 +135,8 @@ async def admin_area(current_user: dict = Depends(require_role('admin'))):
     return {"message": "Welcome to admin area", "email": current_user.get("email")}
 
 
-@router.post("/login")
-async def login_route(payload: UserLogin, response: Response, session: AsyncSession = Depends(get_db)):
+@router.post("/login", dependencies=[_auth_rate_limit("login")], openapi_extra=json_body_openapi(UserLogin))
+async def login_route(response: Response, payload: UserLogin = Depends(json_body(UserLogin)), session: AsyncSession = Depends(get_db)):
     # login_user returns {'access_token': ..., 'refresh_token': ...}
     data = await login_user(payload.email, payload.password, session)
     # if login failed, return directly
@@ -141,32 +150,32 @@ async def login_route(payload: UserLogin, response: Response, session: AsyncSess
     return {"message": data.get("message"), "access_token": data.get("access_token"), "refresh_token": refresh}
 
 
-@router.post("/reset-password")
-async def reset_password_route(payload: PasswordReset, session: AsyncSession = Depends(get_db)):
+@router.post("/reset-password", dependencies=[_auth_rate_limit("reset-password")], openapi_extra=json_body_openapi(PasswordReset))
+async def reset_password_route(payload: PasswordReset = Depends(json_body(PasswordReset)), session: AsyncSession = Depends(get_db)):
     return await reset_password(payload.email)
 
 
-@router.post("/send-otp")
-async def send_otp_route(payload: SendCode, session: AsyncSession = Depends(get_db)):
+@router.post("/send-otp", dependencies=[_auth_rate_limit("otp")], openapi_extra=json_body_openapi(SendCode))
+async def send_otp_route(payload: SendCode = Depends(json_body(SendCode)), session: AsyncSession = Depends(get_db)):
     # backward-compatible wrapper that delegates to the unified send handler
     # prefer mobile if provided, otherwise use email
     return await send_code_route(payload, transport='otp', session=session)
 
 
-@router.post("/send-email-code")
-async def send_email_code_route(payload: SendCode, session: AsyncSession = Depends(get_db)):
+@router.post("/send-email-code", openapi_extra=json_body_openapi(SendCode))
+async def send_email_code_route(payload: SendCode = Depends(json_body(SendCode)), session: AsyncSession = Depends(get_db)):
     # backward-compatible wrapper that delegates to the unified send handler
     return await send_code_route(payload, transport='email', session=session)
 
 
-@router.post("/resend-otp")
-async def resend_otp_route(payload: SendCode, session: AsyncSession = Depends(get_db)):
+@router.post("/resend-otp", dependencies=[_auth_rate_limit("otp")], openapi_extra=json_body_openapi(SendCode))
+async def resend_otp_route(payload: SendCode = Depends(json_body(SendCode)), session: AsyncSession = Depends(get_db)):
     # resend is the same as send in our unified handler (cooldown handled by service)
     return await send_code_route(payload, transport='otp', session=session)
 
 
-@router.post("/send-code")
-async def send_code_route(payload: SendCode, transport: str = 'otp', session: AsyncSession = Depends(get_db)):
+@router.post("/send-code", openapi_extra=json_body_openapi(SendCode))
+async def send_code_route(payload: SendCode = Depends(json_body(SendCode)), transport: str = 'otp', session: AsyncSession = Depends(get_db)):
     """Unified endpoint for sending or resending verification codes.
 
     - transport: 'otp' (default) or 'email'
@@ -187,9 +196,11 @@ async def send_code_route(payload: SendCode, transport: str = 'otp', session: As
     return await generate_otp(target, session)
 
 
-@router.post("/refresh-tokens")
+@router.post("/refresh-tokens", openapi_extra=json_body_openapi(TokenRefresh, optional=True))
 async def refresh_tokens_route(
-    request: Request, payload: TokenRefresh | None = None, session: AsyncSession = Depends(get_db)
+    request: Request,
+    payload: TokenRefresh | None = Depends(json_body(TokenRefresh, optional=True)),
+    session: AsyncSession = Depends(get_db),
 ):
     # prefer cookie if present (HttpOnly cookie set by login), otherwise fall back to payload
     refresh_token = None
@@ -208,31 +219,38 @@ async def refresh_tokens_route(
     return result
 
 
-@router.post("/logout")
-async def logout(payload: TokenRefresh | None = None, request: Request = None, response: Response = None, session: AsyncSession = Depends(get_db)):
+@router.post("/logout", openapi_extra=json_body_openapi(TokenRefresh, optional=True))
+async def logout(
+    request: Request,
+    response: Response,
+    payload: TokenRefresh | None = Depends(json_body(TokenRefresh, optional=True)),
+    session: AsyncSession = Depends(get_db),
+):
     # support body-provided refresh_token or cookie
     refresh_token = None
     if payload and getattr(payload, "refresh_token", None):
         refresh_token = payload.refresh_token
-    elif request:
+    else:
         refresh_token = request.cookies.get("refresh_token")
 
     if refresh_token:
         await logout_refresh_token(refresh_token, session)
 
     # clear cookie
-    if response:
-        clear_refresh_cookie(response)
+    clear_refresh_cookie(response)
     return {"message": "User logged out"}
 
 
-@router.post("/register")
-async def register_route(payload: UserRegister, session: AsyncSession = Depends(get_db)):
+@router.post("/register", openapi_extra=json_body_openapi(UserRegister))
+async def register_route(payload: UserRegister = Depends(json_body(UserRegister)), session: AsyncSession = Depends(get_db)):
     return await register_user(payload.email, payload.password, session)
 
 
 @router.get("/users/{email}/roles")
 async def get_roles_route(email: str, current_user: dict = Depends(require_role('admin')), session: AsyncSession = Depends(get_db)):
+    if email == current_user.get("email"):
+        # require_role already loaded this user's roles for the request
+        return {"email": email, "roles": current_user.get("roles", "")}
     roles = await get_user_roles(email, session)
     if roles is None:
         return {"error": "not_found"}
@@ -248,13 +266,13 @@ async def set_roles_route(email: str, payload: dict, current_user: dict = Depend
     return await set_user_roles(email, roles, session)
 
 
-@router.post("/verify-email")
-async def verify_email_route(payload: EmailVerification, session: AsyncSession = Depends(get_db)):
+@router.post("/verify-email", openapi_extra=json_body_openapi(EmailVerification))
+async def verify_email_route(payload: EmailVerification = Depends(json_body(EmailVerification)), session: AsyncSession = Depends(get_db)):
     return await verify_email(payload.email, payload.code, session)
 
 
-@router.post("/verify-otp")
-async def verify_otp_route(payload: OTPVerification, session: AsyncSession = Depends(get_db)):
+@router.post("/verify-otp", dependencies=[_auth_rate_limit("verify-otp")], openapi_extra=json_body_openapi(OTPVerification))
+async def verify_otp_route(payload: OTPVerification = Depends(json_body(OTPVerification)), session: AsyncSession = Depends(get_db)):
     # payload.otp currently doesn't include the email so verification requires email in real flows
     # for tests where otp is global, caller may use the test default '9999'
     # If clients provide email as well, consider adding a dedicated schema.
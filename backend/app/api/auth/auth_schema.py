@@ -1,36 +1,46 @@
-from pydantic import BaseModel, EmailStr
+from pydantic import BaseModel, ConfigDict, EmailStr
 
 
-class UserLogin(BaseModel):
+class _AuthBody(BaseModel):
+    # request bodies are read-only; bound strings so oversized input is
+    # rejected by the validator. Unknown keys stay allowed: the frontend
+    # sends first_name/last_name on register.
+    model_config = ConfigDict(str_max_length=255, frozen=True)
+
+
+class UserLogin(_AuthBody):
     email: EmailStr
     password: str
 
 
-class UserRegister(BaseModel):
+class UserRegister(_AuthBody):
     email: EmailStr
     password: str
 
 
-class PasswordReset(BaseModel):
+class PasswordReset(_AuthBody):
     email: EmailStr
 
 
-class SendCode(BaseModel):
+class SendCode(_AuthBody):
     # used for sending OTPs or email verification codes
     email: EmailStr | None = None
     mobile: str | None = None
 
 
-class TokenRefresh(BaseModel):
+class TokenRefresh(_AuthBody):
+    # signed JWTs with role claims run past 255 characters
+    model_config = ConfigDict(str_max_length=4096)
+
     # Optional so cookie-only refresh/logout requests don't 422 when body is empty
     refresh_token: str | None = None
 
 
-class EmailVerification(BaseModel):
+class EmailVerification(_AuthBody):
     email: EmailStr
     code: str
 
 
-class OTPVerification(BaseModel):
+class OTPVerification(_AuthBody):
     email: EmailStr | None = None
     otp: str
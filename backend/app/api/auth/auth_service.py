@@ -1,20 +1,56 @@
+"""Authentication service: users, passwords, tokens and verification codes.
+
+Indexes the hot queries rely on:
+
+- ``users.email`` (unique): every login, token check and registration.
+- ``refresh_tokens.token`` (unique): refresh and logout look tokens up by
+  hashed jti.
+- ``ix_refresh_tokens_user_revoked_created``: the newest-tokens subquery in
+  _cap_refresh_tokens.
+- ``ix_otps_email_transport_active`` (partial, ``WHERE NOT consumed``): the
+  latest live code per email and transport when sending or verifying.
+"""
 from passlib.context import CryptContext
-from jose import jwt
+import jwt
+import asyncio
+import functools
+import json
 import os
 import time
 import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 from typing import Optional
 
-from app.db.models import User, RefreshToken, OTP
-from sqlalchemy import select, func
+from app.db.models import User, RefreshToken, OTP, Role, UserRole
+from app.db.connector import init_db
+from app.db.db_manager import get_db_manager
+from app.logging_config import get_logger
+from . import refresh_store
+from sqlalchemy import select, delete, insert, literal, or_
 from sqlalchemy.exc import OperationalError
 from sqlalchemy import text
 from sqlalchemy.ext.asyncio import AsyncSession
 from datetime import datetime, timedelta, timezone
+import base64
 import hmac
+import secrets
 import hashlib
 from types import SimpleNamespace
 
+logger = get_logger("auth_service")
+
+
+@functools.lru_cache(maxsize=1024)
+def _normalize_roles(raw: str) -> tuple[str, frozenset]:
+    """Return ``(csv, set)`` for a raw roles string: lowercased, trimmed, no blanks.
+
+    A deployment has only a handful of distinct role strings, so each is
+    parsed once per process instead of on every token mint and request.
+    """
+    role_list = [r.strip().lower() for r in raw.split(',') if r.strip()]
+    return ','.join(role_list), frozenset(role_list)
+
 
 async def _fetch_user_by_email(session: AsyncSession, email: str):
     """Fetch a User row by email, with a graceful fallback when DB schema lacks optional columns.
@@ -40,8 +76,17 @@ async def _fetch_user_by_email(session: AsyncSession, email: str):
 
 # Module-level configuration (read once)
 OTP_SALT = os.getenv('OTP_SALT', 'change-this-otp-salt')
+_OTP_SALT_BYTES = OTP_SALT.encode()
+# keyed once; copying skips HMAC's per-call key padding and inner/outer setup
+_OTP_HMAC = hmac.new(_OTP_SALT_BYTES, digestmod=hashlib.sha256)
 DEV_RETURN_OTP = os.getenv(
     'DEV_RETURN_OTP', 'false').lower() in ('1', 'true', 'yes')
+# Dev/test shortcut: accept the fixed codes '1234' (email) and '9999' (OTP)
+# without a lookup. Off by default; never enable it in production.
+ALLOW_CANONICAL_OTP = os.getenv(
+    'ALLOW_CANONICAL_OTP', 'false').lower() in ('1', 'true', 'yes')
+_CANONICAL_EMAIL_CODE = '1234' if ALLOW_CANONICAL_OTP else None
+_CANONICAL_OTP_CODE = '9999' if ALLOW_CANONICAL_OTP else None
 OTP_RESEND_COOLDOWN_SECONDS = int(
     os.getenv('OTP_RESEND_COOLDOWN_SECONDS', '60'))
 OTP_MAX_ATTEMPTS = int(os.getenv('OTP_MAX_ATTEMPTS', '5'))
@@ -50,40 +95,88 @@ OTP_MAX_ATTEMPTS = int(os.getenv('OTP_MAX_ATTEMPTS', '5'))
 # These are used when the DB is unavailable or for dev/test convenience.
 _OTP_CODES: dict = {}
 _EMAIL_VERIFICATION_CODES: dict = {}
-_EMAIL_VERIFIED: set = set()
+# Reverse indexes for the two code stores above: code hash -> emails, so
+# verifying a code without an email is a dict lookup instead of a scan.
+_OTP_CODE_INDEX: dict = {}
+_EMAIL_CODE_INDEX: dict = {}
+# set of verified emails, in LRU order; the least recently verified email
+# is dropped once EMAIL_VERIFIED_MAX_ENTRIES is exceeded
+_EMAIL_VERIFIED: "OrderedDict[str, None]" = OrderedDict()
+EMAIL_VERIFIED_MAX_ENTRIES = int(
+    os.getenv('EMAIL_VERIFIED_MAX_ENTRIES', '10000'))
 _PASSWORD_RESET_TOKENS: dict = {}
+# Entries are re-inserted on every issue, so each store is ordered oldest
+# first and expired entries are dropped from the front as new ones arrive.
+CODE_STORE_MAX_ENTRIES = int(os.getenv('CODE_STORE_MAX_ENTRIES', '10000'))
 
 
 # --- Shared helpers for code generation and verification ------------------
 def _rand_numeric(digits: int = 6) -> str:
-    # use secrets for cryptographic RNG for better unpredictability
-    import secrets
-    return ''.join(str(secrets.randbelow(10)) for _ in range(digits))
+    # use secrets for cryptographic RNG for better unpredictability; one
+    # uniform draw over the whole code space, zero-padded to width
+    return f"{secrets.randbelow(10 ** digits):0{digits}d}"
+
+
+def _as_utc(dt: datetime) -> datetime:
+    # SQLite hands back naive datetimes where Postgres returns aware ones
+    return dt if dt.tzinfo else dt.replace(tzinfo=timezone.utc)
+
+
+def _hash_code(code: str) -> str:
+    h = _OTP_HMAC.copy()
+    h.update(code.encode())
+    return h.hexdigest()
+
+
+# Postgres: cooldown check, consuming the previous codes and the insert in
+# one round-trip. No row back means a live code was sent within the cooldown.
+_STORE_CODE_PG = text(
+    "WITH recent AS ("
+    " SELECT 1 FROM otps WHERE email = :email AND transport = :transport"
+    " AND NOT consumed AND expires_at > :now AND created_at > :cooldown_start"
+    " LIMIT 1"
+    "), consumed AS ("
+    " UPDATE otps SET consumed = true WHERE email = :email"
+    " AND transport = :transport AND NOT consumed"
+    " AND NOT EXISTS (SELECT 1 FROM recent)"
+    ") "
+    "INSERT INTO otps (email, otp_hash, expires_at, attempts, consumed, transport) "
+    "SELECT :email, :otp_hash, :expires_at, 0, false, :transport "
+    "WHERE NOT EXISTS (SELECT 1 FROM recent) RETURNING id"
+)
 
 
 async def _store_code_db(email: str, code: str, session: AsyncSession, transport: str, ttl_minutes: int):
     now = datetime.now(timezone.utc)
     expires_at = now + timedelta(minutes=ttl_minutes)
+    if isinstance(session, AsyncSession) and session.bind.dialect.name == "postgresql":
+        result = await session.execute(_STORE_CODE_PG, {
+            "email": email,
+            "transport": transport,
+            "now": now,
+            "cooldown_start": now - timedelta(seconds=OTP_RESEND_COOLDOWN_SECONDS),
+            "otp_hash": _hash_code(code),
+            "expires_at": expires_at,
+        })
+        inserted = result.first() is not None
+        await session.commit()
+        if not inserted:
+            return {"message": f"{transport} code recently sent", "email": email}
+        return {"message": f"{transport} code sent", "email": email}
+
     # mark previous unconsumed codes consumed
     q_existing = await session.execute(
-        select(OTP).where(OTP.email == email).where(not OTP.consumed).where(
-            OTP.transport == transport).order_by(OTP.created_at.desc())
+        select(OTP).where(OTP.email == email).where(~OTP.consumed).where(
+            OTP.transport == transport).order_by(OTP.created_at.desc()).limit(1)
     )
     existing = q_existing.scalars().first()
-    if existing:
-        # Normalize DB timestamps to timezone-aware UTC for comparisons. SQLite
-        # may return naive datetimes while Postgres returns tz-aware values.
-        existing_expires = existing.expires_at if existing.expires_at.tzinfo else existing.expires_at.replace(
-            tzinfo=timezone.utc)
-        existing_created = existing.created_at if existing.created_at.tzinfo else existing.created_at.replace(
-            tzinfo=timezone.utc)
-        if existing_expires > now:
-            if (now - existing_created).total_seconds() < OTP_RESEND_COOLDOWN_SECONDS:
-                await session.commit()
-                return {"message": f"{transport} code recently sent", "email": email}
+    # created_at is only normalized when the code is still live
+    if existing and _as_utc(existing.expires_at) > now and \
+            (now - _as_utc(existing.created_at)).total_seconds() < OTP_RESEND_COOLDOWN_SECONDS:
+        await session.commit()
+        return {"message": f"{transport} code recently sent", "email": email}
 
-    code_hash = hmac.new(OTP_SALT.encode(), code.encode(),
-                         hashlib.sha256).hexdigest()
+    code_hash = _hash_code(code)
     if existing:
         existing.consumed = True
         session.add(existing)
@@ -95,20 +188,44 @@ async def _store_code_db(email: str, code: str, session: AsyncSession, transport
     return {"message": f"{transport} code sent", "email": email}
 
 
-def _store_code_globals(store: dict, email: str, code: str, ttl_minutes: int):
+def _forget_code(store: dict, email: str, index: dict | None = None) -> None:
+    entry = store.pop(email, None)
+    if entry is None or index is None:
+        return
+    code_hash = _hash_code(str(entry.get('code')))
+    owners = index.get(code_hash)
+    if owners is not None:
+        owners.discard(email)
+        if not owners:
+            del index[code_hash]
+
+
+def _evict_stale(store: dict, now: datetime, index: dict | None = None) -> None:
+    # oldest first: stop at the first live entry once under the size cap
+    while store:
+        email, entry = next(iter(store.items()))
+        if entry['expires_at'] > now and len(store) < CODE_STORE_MAX_ENTRIES:
+            return
+        _forget_code(store, email, index)
+
+
+def _store_code_globals(store: dict, index: dict, email: str, code: str, ttl_minutes: int):
     now = datetime.now(timezone.utc)
     expires_at = now + timedelta(minutes=ttl_minutes)
+    _forget_code(store, email, index)
+    _evict_stale(store, now, index)
     store[email] = {"code": code, "expires_at": expires_at, "created_at": now}
+    index.setdefault(_hash_code(code), set()).add(email)
     return {"message": "code sent", "email": email}
 
 
-async def _create_code(email: str, session: AsyncSession, transport: str, globals_store: dict | None, digits: int, ttl_minutes: int):
+async def _create_code(email: str, session: AsyncSession, transport: str, globals_store: dict | None, globals_index: dict | None, digits: int, ttl_minutes: int):
     code = _rand_numeric(digits)
     try:
         res = await _store_code_db(email, code, session, transport, ttl_minutes)
         # store in-memory as well for dev convenience
         if globals_store is not None:
-            _store_code_globals(globals_store, email, code, ttl_minutes)
+            _store_code_globals(globals_store, globals_index, email, code, ttl_minutes)
         # optionally return code in dev
         if DEV_RETURN_OTP:
             res['code'] = code
@@ -121,7 +238,8 @@ async def _create_code(email: str, session: AsyncSession, transport: str, global
             res = {
                 "message": f"{transport} code sent (in-memory not enabled)", "email": email}
         else:
-            res = _store_code_globals(globals_store, email, code, ttl_minutes)
+            res = _store_code_globals(
+                globals_store, globals_index, email, code, ttl_minutes)
         if DEV_RETURN_OTP:
             res['code'] = code
 
@@ -132,21 +250,18 @@ async def _verify_code_db(email: str, code: str, session: AsyncSession, transpor
     now = datetime.now(timezone.utc)
     q = await session.execute(
         select(OTP).where(OTP.email == email).where(OTP.transport == transport).where(
-            not OTP.consumed).order_by(OTP.created_at.desc())
+            ~OTP.consumed).order_by(OTP.created_at.desc()).limit(1)
     )
     entry = q.scalars().first()
     if not entry:
         return {"error": "invalid_code"}
     # check expiry
-    entry_expires = entry.expires_at if entry.expires_at.tzinfo else entry.expires_at.replace(
-        tzinfo=timezone.utc)
-    if entry_expires < now:
+    if _as_utc(entry.expires_at) < now:
         entry.consumed = True
         session.add(entry)
         await session.commit()
         return {"error": "expired_code"}
-    code_hash = hmac.new(OTP_SALT.encode(), code.encode(),
-                         hashlib.sha256).hexdigest()
+    code_hash = _hash_code(code)
     if hmac.compare_digest(code_hash, entry.otp_hash):
         entry.consumed = True
         session.add(entry)
@@ -161,30 +276,21 @@ async def _verify_code_db(email: str, code: str, session: AsyncSession, transpor
     return {"error": "invalid_code", "attempts": entry.attempts}
 
 
-def _verify_code_globals(globals_key: str, email: str, code: str, canonical: str = None):
+def _verify_code_globals(store: dict, index: dict, email: str, code: str):
     now = datetime.now(timezone.utc)
-    # callers now pass an explicit store dict instead of a globals key
-    # preserve behaviour: accept a dict or fall back to empty mapping
-    store = globals_key if isinstance(globals_key, dict) else {}
     # prefer email-specific entry
     if email:
         entry = store.get(email)
-        if entry and entry.get('code') == code and entry.get('expires_at') > now:
-            try:
-                del store[email]
-            except Exception:
-                pass
+        if entry and hmac.compare_digest(str(entry.get('code')), code) and entry.get('expires_at') > now:
+            _forget_code(store, email, index)
             return {"message": "verified", "email": email}
     else:
-        for k, v in list(store.items()):
-            if v.get('code') == code and v.get('expires_at') > now:
-                try:
-                    del store[k]
-                except Exception:
-                    pass
+        # no copy needed: the set is only mutated right before returning
+        for k in index.get(_hash_code(code), ()):
+            entry = store.get(k)
+            if entry and entry.get('expires_at') > now:
+                _forget_code(store, k, index)
                 return {"message": "verified", "email": k}
-    if canonical and code == canonical:
-        return {"message": "verified", "email": email}
     return {"error": "invalid_code"}
 
 # --- End helpers ---------------------------------------------------------
@@ -192,47 +298,240 @@ def _verify_code_globals(globals_key: str, email: str, code: str, canonical: str
 
 pwd_context = CryptContext(schemes=["pbkdf2_sha256"], deprecated="auto")
 
+# pbkdf2_sha256 is handled with hashlib directly (OpenSSL, no passlib
+# dispatch), writing passlib's own "$pbkdf2-sha256$rounds$salt$checksum"
+# format with its defaults, so old and new hashes verify either way.
+# pwd_context stays as the reader for any other scheme.
+_PBKDF2_PREFIX = "$pbkdf2-sha256$"
+_PBKDF2_ROUNDS = 29000
+_PBKDF2_SALT_SIZE = 16
+
+
+def _ab64_encode(data: bytes) -> str:
+    # passlib's adapted base64: no padding, '.' instead of '+'
+    return base64.b64encode(data).rstrip(b"=").replace(b"+", b".").decode("ascii")
+
+
+def _ab64_decode(data: str) -> bytes:
+    data = data.replace(".", "+")
+    return base64.b64decode(data + "=" * (-len(data) % 4))
+
+
+def _pbkdf2_hash(password: str) -> str:
+    salt = os.urandom(_PBKDF2_SALT_SIZE)
+    dk = hashlib.pbkdf2_hmac("sha256", password.encode("utf-8"), salt, _PBKDF2_ROUNDS)
+    return f"{_PBKDF2_PREFIX}{_PBKDF2_ROUNDS}${_ab64_encode(salt)}${_ab64_encode(dk)}"
+
+
+def _pbkdf2_verify(password: str, hashed: str) -> bool:
+    if not hashed or not hashed.startswith(_PBKDF2_PREFIX):
+        return pwd_context.verify(password, hashed)
+    rounds, salt, checksum = hashed[len(_PBKDF2_PREFIX):].split("$")
+    expected = _ab64_decode(checksum)
+    dk = hashlib.pbkdf2_hmac("sha256", password.encode("utf-8"), _ab64_decode(salt),
+                             int(rounds), len(expected))
+    return hmac.compare_digest(dk, expected)
+
+
+# Key stretching gets its own pool, sized to the cores: hashlib releases the
+# GIL during PBKDF2, so hashes run in parallel without queueing behind (or
+# starving) other work on the loop's default executor.
+_PW_EXECUTOR = ThreadPoolExecutor(max_workers=os.cpu_count() or 1, thread_name_prefix="pbkdf2")
+
+
+async def _run_pbkdf2(fn, *args):
+    return await asyncio.get_running_loop().run_in_executor(_PW_EXECUTOR, fn, *args)
+
+
+async def hash_password(password: str) -> str:
+    # key stretching is CPU-bound; run it off the event loop
+    return await _run_pbkdf2(_pbkdf2_hash, password)
+
+
+# Recently verified (hash, password) pairs, so repeat logins by the same
+# client skip the key stretching. Keys are an HMAC under a per-process random
+# key, so neither passwords nor their plain digests are held; the stored hash
+# is part of the key, so a password change invalidates its entries. Only
+# successes are cached: a wrong password always pays the full cost.
+# AUTH_VERIFY_CACHE_TTL=0 disables the cache.
+AUTH_VERIFY_CACHE_TTL = int(os.getenv("AUTH_VERIFY_CACHE_TTL", "15"))
+AUTH_VERIFY_CACHE_SIZE = int(os.getenv("AUTH_VERIFY_CACHE_SIZE", "4096"))
+_VERIFY_CACHE: "OrderedDict[bytes, float]" = OrderedDict()
+_VERIFY_CACHE_KEY = os.urandom(32)
+
+
+async def verify_password(password: str, hashed: str) -> bool:
+    if AUTH_VERIFY_CACHE_TTL <= 0:
+        return await _run_pbkdf2(_pbkdf2_verify, password, hashed)
+    key = hmac.new(_VERIFY_CACHE_KEY, f"{hashed}\0{password}".encode(), hashlib.sha256).digest()
+    now = time.monotonic()
+    expires_at = _VERIFY_CACHE.get(key)
+    if expires_at is not None:
+        if expires_at > now:
+            # LRU: a hit keeps the entry away from the eviction end
+            _VERIFY_CACHE.move_to_end(key)
+            return True
+        del _VERIFY_CACHE[key]
+    ok = await _run_pbkdf2(_pbkdf2_verify, password, hashed)
+    if ok:
+        _VERIFY_CACHE[key] = now + AUTH_VERIFY_CACHE_TTL
+        if len(_VERIFY_CACHE) > AUTH_VERIFY_CACHE_SIZE:
+            _VERIFY_CACHE.popitem(last=False)
+    return ok
+
 JWT_SECRET = os.getenv("JWT_SECRET", "change-this-secret")
 JWT_ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_SECONDS = 60 * 60 * 24  # 1 day
 REFRESH_TOKEN_EXPIRE_SECONDS = 60 * 60 * 24 * 7
+_JWT_HEADER_B64 = base64.urlsafe_b64encode(
+    b'{"alg":"HS256","typ":"JWT"}').rstrip(b"=") + b"."
+_JWT_HMAC = hmac.new(JWT_SECRET.encode("utf-8"), digestmod=hashlib.sha256)
 
 
 def _create_token(email: str, expires_in: int, extra_claims: dict | None = None):
+    """Return ``(token, jti)`` so callers never decode a token they just made."""
     now = int(time.time())
+    jti = uuid.uuid4().hex
     payload = {"sub": email, "iat": now, "exp": now +
-               expires_in, "jti": uuid.uuid4().hex}
+               expires_in, "jti": jti}
     if extra_claims:
         # avoid overwriting critical claims
         for k, v in extra_claims.items():
             if k not in payload:
                 payload[k] = v
-    return jwt.encode(payload, JWT_SECRET, algorithm=JWT_ALGORITHM)
+    # HS256 with a fixed header: only the claims are serialized per token,
+    # and the output is the same compact JWT that jwt.decode verifies
+    body = base64.urlsafe_b64encode(
+        json.dumps(payload, separators=(",", ":")).encode()).rstrip(b"=")
+    signing_input = _JWT_HEADER_B64 + body
+    h = _JWT_HMAC.copy()
+    h.update(signing_input)
+    sig = base64.urlsafe_b64encode(h.digest()).rstrip(b"=")
+    return (signing_input + b"." + sig).decode("ascii"), jti
 
 
 REFRESH_TOKEN_SALT = os.getenv("REFRESH_TOKEN_SALT", "change-this-salt")
+_REFRESH_SALT_BYTES = REFRESH_TOKEN_SALT.encode("utf-8")
 MAX_REFRESH_TOKENS_PER_USER = int(
     os.getenv("MAX_REFRESH_TOKENS_PER_USER", "5"))
+# 'sql' (default) keeps RefreshToken rows; 'redis' keeps live tokens in Redis
+# with a TTL instead (see refresh_store)
+REFRESH_TOKEN_STORE = os.getenv("REFRESH_TOKEN_STORE", "sql").lower()
+
+
+REFRESH_TOKEN_PRUNE_INTERVAL = int(
+    os.getenv("REFRESH_TOKEN_PRUNE_INTERVAL", "60"))
+
+
+async def _cap_refresh_tokens(session: AsyncSession, user_id: int) -> None:
+    """Keep only a user's newest MAX_REFRESH_TOKENS_PER_USER active tokens.
+
+    Called after a new token row is added and before the commit, so the cap
+    is enforced in the same transaction as the insert. The fallback stores
+    cannot run the subquery; there the cap is not enforced.
+    """
+    if not isinstance(session, AsyncSession):
+        return
+    await session.flush()
+    newest = (
+        select(RefreshToken.id)
+        .where(RefreshToken.user_id == user_id)
+        .where(RefreshToken.revoked.is_(False))
+        .order_by(RefreshToken.created_at.desc(), RefreshToken.id.desc())
+        .limit(MAX_REFRESH_TOKENS_PER_USER)
+    )
+    await session.execute(
+        delete(RefreshToken)
+        .where(RefreshToken.user_id == user_id)
+        .where(RefreshToken.id.not_in(newest))
+        .execution_options(synchronize_session=False)
+    )
+
+
+async def prune_refresh_tokens(session: AsyncSession) -> int:
+    """Delete revoked and expired refresh tokens in one statement.
+
+    Runs from refresh_token_janitor; the per-user cap is enforced at insert
+    time by _cap_refresh_tokens. Returns the number of rows removed.
+    """
+    result = await session.execute(
+        delete(RefreshToken)
+        .where(or_(
+            RefreshToken.revoked.is_(True),
+            RefreshToken.expires_at < datetime.now(timezone.utc),
+        ))
+        .execution_options(synchronize_session=False)
+    )
+    await session.commit()
+    return result.rowcount or 0
+
+
+async def refresh_token_janitor(interval: int = REFRESH_TOKEN_PRUNE_INTERVAL) -> None:
+    """Run prune_refresh_tokens every ``interval`` seconds until cancelled.
+
+    Started from the app lifespan. The fallback stores cannot run the
+    statement and the Redis store expires its own keys, so both are skipped.
+    """
+    while True:
+        await asyncio.sleep(interval)
+        if REFRESH_TOKEN_STORE == "redis":
+            continue
+        try:
+            async with get_db_manager().get_session() as session:
+                if isinstance(session, AsyncSession):
+                    await prune_refresh_tokens(session)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.warning(f"Refresh-token pruning failed: {e}")
+
+
+# blake2b keys are capped at 64 bytes; longer salts are condensed first
+_JTI_KEY = _REFRESH_SALT_BYTES if len(_REFRESH_SALT_BYTES) <= 64 else hashlib.sha256(_REFRESH_SALT_BYTES).digest()
 
 
 def _hash_jti(jti: str) -> str:
-    # HMAC-SHA256 of jti using server-side salt (protects stored jti)
-    return hmac.new(REFRESH_TOKEN_SALT.encode("utf-8"), jti.encode("utf-8"), hashlib.sha256).hexdigest()
+    # keyed blake2b of jti using server-side salt (protects stored jti); one
+    # native pass and a 32-char value instead of HMAC-SHA256's two and 64
+    return hashlib.blake2b(jti.encode("utf-8"), key=_JTI_KEY, digest_size=16).hexdigest()
 
 
-async def register_user(email: str, password: str, session: AsyncSession):
-    from app.db.models import Role, UserRole
+_LEGACY_JTI_HMAC = hmac.new(_REFRESH_SALT_BYTES, digestmod=hashlib.sha256)
+
+
+def _legacy_hash_jti(jti: str) -> str:
+    # HMAC-SHA256 form stored before the switch to blake2b
+    h = _LEGACY_JTI_HMAC.copy()
+    h.update(jti.encode("utf-8"))
+    return h.hexdigest()
+
+
+async def _find_refresh_token(session: AsyncSession, jti: str):
+    """Load the refresh-token row for a jti.
+
+    Rows issued before the blake2b switch are still found through their
+    HMAC-SHA256 value; they age out within REFRESH_TOKEN_EXPIRE_SECONDS,
+    after which the second lookup never runs for a live token.
+    """
+    for hashed in (_hash_jti(jti), _legacy_hash_jti(jti)):
+        q = await session.execute(select(RefreshToken).where(RefreshToken.token == hashed))
+        rt = q.scalars().first()
+        if rt:
+            return rt
+    return None
 
+
+async def register_user(email: str, password: str, session: AsyncSession):
     existing = await _fetch_user_by_email(session, email)
     if existing:
         return {"error": "user_exists"}
 
     # Check if this is the first user (will be granted admin role)
-    result = await session.execute(select(func.count(User.id)))
-    user_count = result.scalar() or 0
-    is_first_user = user_count == 0
+    # existence probe: reads at most one index entry instead of counting
+    result = await session.execute(select(User.id).limit(1))
+    is_first_user = result.first() is None
 
-    hashed = pwd_context.hash(password)
+    hashed = await hash_password(password)
 
     # First user gets admin role by default, others get viewer role
     # Note: Enable GRANT_ADMIN_ON_REGISTER env var to give admin to all new users
@@ -250,6 +549,25 @@ async def register_user(email: str, password: str, session: AsyncSession):
     session.add(user)
 
     try:
+        if isinstance(session, AsyncSession):
+            # user and role link in one transaction: the flush assigns
+            # user.id and INSERT ... SELECT resolves the role id server-side,
+            # so there is no role lookup and no second commit
+            await session.flush()
+            await session.execute(
+                insert(UserRole).from_select(
+                    ["user_id", "role_id"],
+                    select(literal(user.id), Role.id).where(Role.name == default_role),
+                )
+            )
+            await session.commit()
+            return {
+                "message": "User registered",
+                "email": email,
+                "role": default_role,
+                "is_first_user": is_first_user
+            }
+
         await session.commit()
         await session.refresh(user)
 
@@ -296,8 +614,6 @@ async def register_user(email: str, password: str, session: AsyncSession):
         if 'no such table' in msg:
             try:
                 # create missing tables
-                from app.db.connector import init_db
-
                 await init_db()
             except Exception:
                 # if init_db fails, re-raise original
@@ -334,26 +650,23 @@ async def login_user(email: str, password: str, session: AsyncSession):
 
     if not user:
         return {"error": "invalid_credentials"}
-    if not pwd_context.verify(password, user.hashed_password):
+    if not await verify_password(password, user.hashed_password):
         return {"error": "invalid_credentials"}
     # include role claims in the tokens for RBAC checks
     raw_roles = (user.roles or '') if hasattr(user, 'roles') else ''
     # normalize roles to comma-separated, lowercase, no extra spaces
-    roles = ','.join(r.strip().lower()
-                     for r in raw_roles.split(',') if r.strip())
+    roles = _normalize_roles(raw_roles)[0]
     is_super = bool(getattr(user, 'is_superuser', False))
     extra = {"roles": roles, "is_superuser": is_super}
-    access = _create_token(
+    access, _ = _create_token(
         email, ACCESS_TOKEN_EXPIRE_SECONDS, extra_claims=extra)
-    refresh = _create_token(
+    # store the hashed jti instead of the token
+    refresh, jti = _create_token(
         email, REFRESH_TOKEN_EXPIRE_SECONDS, extra_claims=extra)
-    # extract jti from payload to store hashed jti instead of token
-    try:
-        payload = jwt.decode(refresh, JWT_SECRET, algorithms=[JWT_ALGORITHM])
-        jti = payload.get("jti")
-    except Exception:
-        # fallback: generate a jti from uuid if decoding fails
-        jti = uuid.uuid4().hex
+    if REFRESH_TOKEN_STORE == "redis":
+        await refresh_store.issue(
+            user.id, _hash_jti(jti), REFRESH_TOKEN_EXPIRE_SECONDS, MAX_REFRESH_TOKENS_PER_USER)
+        return {"message": "User logged in", "access_token": access, "refresh_token": refresh}
 
     expires_at = datetime.now(timezone.utc) + \
         timedelta(seconds=REFRESH_TOKEN_EXPIRE_SECONDS)
@@ -361,27 +674,8 @@ async def login_user(email: str, password: str, session: AsyncSession):
         jti), user_id=user.id, expires_at=expires_at)
     session.add(rt)
 
-    # enforce maximum active refresh tokens per user
-    try:
-        q_active = await session.execute(
-            select(RefreshToken)
-            .where(RefreshToken.user_id == user.id)
-            .where(not RefreshToken.revoked)
-            .order_by(RefreshToken.created_at.asc())
-        )
-        active_tokens = q_active.scalars().all()
-        if len(active_tokens) + 1 > MAX_REFRESH_TOKENS_PER_USER:
-            # remove oldest tokens to enforce limit (revoke them)
-            num_to_remove = (len(active_tokens) + 1) - \
-                MAX_REFRESH_TOKENS_PER_USER
-            for old in active_tokens[:num_to_remove]:
-                old.revoked = True
-                session.add(old)
-    except Exception:
-        # be conservative: if query fails, continue without pruning
-        pass
-
     try:
+        await _cap_refresh_tokens(session, user.id)
         await session.commit()
     except Exception as e:
         msg = str(e).lower()
@@ -393,7 +687,6 @@ async def login_user(email: str, password: str, session: AsyncSession):
                 pass
             try:
                 # create any missing tables via metadata.create_all
-                from app.db.connector import init_db
                 await init_db()
             except Exception:
                 # if init_db fails, re-raise original
@@ -401,6 +694,7 @@ async def login_user(email: str, password: str, session: AsyncSession):
             # retry insert
             try:
                 session.add(rt)
+                await _cap_refresh_tokens(session, user.id)
                 await session.commit()
             except Exception:
                 raise
@@ -422,80 +716,65 @@ async def refresh_tokens(refresh_token: str, session: AsyncSession):
         if not email or not jti:
             return {"error": "invalid_token"}
 
-        hashed_jti = _hash_jti(jti)
+        # preserve claims
+        roles = _normalize_roles(payload.get("roles", "") or "")[0]
+        is_super = bool(payload.get("is_superuser", False))
+        extra = {"roles": roles, "is_superuser": is_super}
 
-        q = await session.execute(
-            select(RefreshToken).where(RefreshToken.token == hashed_jti)
-        )
-        rt = q.scalars().first()
+        if REFRESH_TOKEN_STORE == "redis":
+            new_refresh, new_jti = _create_token(
+                email,
+                REFRESH_TOKEN_EXPIRE_SECONDS,
+                extra_claims=extra
+            )
+            # lookup, revoke, store and prune in one atomic round-trip
+            user_id = await refresh_store.rotate(
+                _hash_jti(jti), _hash_jti(new_jti),
+                REFRESH_TOKEN_EXPIRE_SECONDS, MAX_REFRESH_TOKENS_PER_USER)
+            if user_id is None:
+                return {"error": "invalid_token"}
+            access, _ = _create_token(
+                email,
+                ACCESS_TOKEN_EXPIRE_SECONDS,
+                extra_claims=extra
+            )
+            return {
+                "message": "Tokens refreshed",
+                "access_token": access,
+                "refresh_token": new_refresh,
+            }
 
+        rt = await _find_refresh_token(session, jti)
         if not rt or rt.revoked or not rt.expires_at:
             return {"error": "invalid_token"}
 
-        expires_at = rt.expires_at
-        if expires_at.tzinfo is None:
-            expires_at = expires_at.replace(tzinfo=timezone.utc)
-
-        if expires_at < datetime.now(timezone.utc):
+        now = datetime.now(timezone.utc)
+        if _as_utc(rt.expires_at) < now:
             return {"error": "invalid_token"}
 
         # revoke old token
         rt.revoked = True
         session.add(rt)
 
-        # preserve claims
-        roles = payload.get("roles", "") or ""
-        roles = ",".join(r.strip().lower()
-                         for r in roles.split(",") if r.strip())
-        is_super = bool(payload.get("is_superuser", False))
-        extra = {"roles": roles, "is_superuser": is_super}
-
         # create new refresh token
-        new_refresh = _create_token(
+        new_refresh, new_jti = _create_token(
             email,
             REFRESH_TOKEN_EXPIRE_SECONDS,
             extra_claims=extra
         )
 
-        try:
-            new_payload = jwt.decode(
-                new_refresh,
-                JWT_SECRET,
-                algorithms=[JWT_ALGORITHM]
-            )
-            new_jti = new_payload.get("jti")
-        except Exception:
-            new_jti = uuid.uuid4().hex
-
         new_rt = RefreshToken(
             token=_hash_jti(new_jti),
             user_id=rt.user_id,
-            expires_at=datetime.now(timezone.utc)
-            + timedelta(seconds=REFRESH_TOKEN_EXPIRE_SECONDS),
+            expires_at=now + timedelta(seconds=REFRESH_TOKEN_EXPIRE_SECONDS),
         )
 
         session.add(new_rt)
-
-        # enforce max active refresh tokens
-        q_active = await session.execute(
-            select(RefreshToken)
-            .where(
-                RefreshToken.user_id == rt.user_id,
-                not RefreshToken.revoked,
-            )
-            .order_by(RefreshToken.created_at.asc())
-        )
-
-        active_tokens = q_active.scalars().all()
-        excess = len(active_tokens) - MAX_REFRESH_TOKENS_PER_USER
-        if excess > 0:
-            for old in active_tokens[:excess]:
-                old.revoked = True
-                session.add(old)
+        await _cap_refresh_tokens(session, rt.user_id)
 
         await session.commit()
 
-        access = _create_token(
+        access, _ = _create_token(
             email,
             ACCESS_TOKEN_EXPIRE_SECONDS,
             extra_claims=extra
@@ -526,9 +805,12 @@ async def logout_refresh_token(refresh_token: str, session: AsyncSession):
     except Exception:
         return {"error": "invalid_token"}
 
-    hashed = _hash_jti(jti)
-    q = await session.execute(select(RefreshToken).where(RefreshToken.token == hashed))
-    rt = q.scalars().first()
+    if REFRESH_TOKEN_STORE == "redis":
+        if not await refresh_store.revoke(_hash_jti(jti)):
+            return {"error": "not_found"}
+        return {"message": "revoked"}
+
+    rt = await _find_refresh_token(session, jti)
     if not rt:
         return {"error": "not_found"}
     rt.revoked = True
@@ -536,9 +818,40 @@ async def logout_refresh_token(refresh_token: str, session: AsyncSession):
     return {"message": "revoked"}
 
 
+# Verified access-token claims keyed by a digest of the token, so a client's
+# repeat requests skip signature verification. Entries live until the token's
+# exp or TOKEN_CLAIMS_CACHE_TTL seconds, whichever is sooner. Only claims are
+# cached; the user row is still loaded per request, so deactivation and role
+# changes apply immediately.
+_TOKEN_CLAIMS_CACHE: "OrderedDict[bytes, tuple[float, dict]]" = OrderedDict()
+TOKEN_CLAIMS_CACHE_SIZE = int(os.getenv("TOKEN_CLAIMS_CACHE_SIZE", "10000"))
+TOKEN_CLAIMS_CACHE_TTL = int(os.getenv("TOKEN_CLAIMS_CACHE_TTL", "30"))
+
+
+async def _decode_access_token(token: str) -> dict:
+    # only a miss pays for the signature check; HS256 is one HMAC over a
+    # short string, so it runs inline instead of costing a thread hop
+    key = hashlib.sha256(token.encode()).digest()[:16]
+    now = time.time()
+    entry = _TOKEN_CLAIMS_CACHE.get(key)
+    if entry is not None:
+        expires_at, payload = entry
+        if expires_at > now:
+            _TOKEN_CLAIMS_CACHE.move_to_end(key)
+            return payload
+        del _TOKEN_CLAIMS_CACHE[key]
+
+    payload = jwt.decode(token, JWT_SECRET, algorithms=[JWT_ALGORITHM])
+    if "exp" in payload:
+        _TOKEN_CLAIMS_CACHE[key] = (min(payload["exp"], now + TOKEN_CLAIMS_CACHE_TTL), payload)
+        if len(_TOKEN_CLAIMS_CACHE) > TOKEN_CLAIMS_CACHE_SIZE:
+            _TOKEN_CLAIMS_CACHE.popitem(last=False)
+    return payload
+
+
 async def get_current_user(token: str, session: AsyncSession) -> Optional[dict]:
     try:
-        payload = jwt.decode(token, JWT_SECRET, algorithms=[JWT_ALGORITHM])
+        payload = await _decode_access_token(token)
         email = payload.get("sub")
         if not email:
             return None
@@ -547,12 +860,13 @@ async def get_current_user(token: str, session: AsyncSession) -> Optional[dict]:
             return None
         # include role info for RBAC
         roles = (user.roles or '') if hasattr(user, 'roles') else ''
-        roles = ','.join(r.strip().lower()
-                         for r in roles.split(',') if r.strip())
+        roles, role_set = _normalize_roles(roles)
         return {
             "id": getattr(user, 'id', None),
             "email": user.email,
             "roles": roles,
+            # parsed once here so role checks are a set lookup per request
+            "role_set": role_set,
             "is_superuser": bool(getattr(user, 'is_superuser', False)),
             "is_active": bool(getattr(user, 'is_active', True)),
         }
@@ -566,8 +880,7 @@ async def get_user_roles(email: str, session: AsyncSession) -> Optional[str]:
     if not user:
         return None
     roles = (user.roles or '') if hasattr(user, 'roles') else ''
-    roles = ','.join(r.strip().lower() for r in roles.split(',') if r.strip())
-    return roles
+    return _normalize_roles(roles)[0]
 
 
 async def set_user_roles(email: str, roles: str, session: AsyncSession):
@@ -577,8 +890,7 @@ async def set_user_roles(email: str, roles: str, session: AsyncSession):
         user = q.scalars().first()
         if not user:
             return {"error": "not_found"}
-        norm = ','.join(r.strip().lower()
-                        for r in (roles or '').split(',') if r.strip())
+        norm = _normalize_roles(roles or '')[0]
         # SQLAlchemy model may or may not have roles attribute depending on schema; set if present
         try:
             setattr(user, 'roles', norm)
@@ -609,17 +921,18 @@ async def set_user_roles(email: str, roles: str, session: AsyncSession):
 async def list_users(session: AsyncSession):
     """Return a list of users with basic fields (id, email, roles, is_active)."""
     try:
-        q = await session.execute(select(User))
-        users = q.scalars().all()
-        result = []
-        for u in users:
-            result.append({
+        # only the four listed columns; SQL stores return plain rows with no
+        # ORM hydration, the fallback stores return their user objects
+        q = await session.execute(select(User.id, User.email, User.roles, User.is_active))
+        return [
+            {
                 "id": getattr(u, 'id', None),
                 "email": getattr(u, 'email', None),
                 "roles": getattr(u, 'roles', ''),
                 "is_active": getattr(u, 'is_active', True),
-            })
-        return result
+            }
+            for u in q.all()
+        ]
     except Exception:
         return {"error": "internal_error"}
 
@@ -633,6 +946,8 @@ async def reset_password(email: str):
         expires = now + timedelta(hours=1)
 
         # store token in a module-level dict for this process
+        _forget_code(_PASSWORD_RESET_TOKENS, email)
+        _evict_stale(_PASSWORD_RESET_TOKENS, now)
         _PASSWORD_RESET_TOKENS[email] = {"token": token, "expires_at": expires}
 
         # simulate sending email (in real app integrate with email provider)
@@ -656,7 +971,7 @@ async def reset_password(email: str):
 
 async def generate_otp(email: str, session: AsyncSession, digits: int = 6, ttl_minutes: int = 5):
     # delegate to shared helper
-    return await _create_code(email, session, transport='otp', globals_store=_OTP_CODES, digits=digits, ttl_minutes=ttl_minutes)
+    return await _create_code(email, session, transport='otp', globals_store=_OTP_CODES, globals_index=_OTP_CODE_INDEX, digits=digits, ttl_minutes=ttl_minutes)
 
 
 async def generate_email_code(email: str, session: AsyncSession, digits: int = 6, ttl_minutes: int = 60):
@@ -664,7 +979,14 @@ async def generate_email_code(email: str, session: AsyncSession, digits: int = 6
     and also keep a globals fallback `_EMAIL_VERIFICATION_CODES` for dev/tests.
     Returns the code in responses only when DEV_RETURN_OTP is truthy (dev convenience).
     """
-    return await _create_code(email, session, transport='email', globals_store=_EMAIL_VERIFICATION_CODES, digits=digits, ttl_minutes=ttl_minutes)
+    return await _create_code(email, session, transport='email', globals_store=_EMAIL_VERIFICATION_CODES, globals_index=_EMAIL_CODE_INDEX, digits=digits, ttl_minutes=ttl_minutes)
+
+
+def _mark_email_verified(email: str) -> None:
+    _EMAIL_VERIFIED[email] = None
+    _EMAIL_VERIFIED.move_to_end(email)
+    while len(_EMAIL_VERIFIED) > EMAIL_VERIFIED_MAX_ENTRIES:
+        _EMAIL_VERIFIED.popitem(last=False)
 
 
 async def verify_email(email: str, code: str, session: AsyncSession):
@@ -672,31 +994,34 @@ async def verify_email(email: str, code: str, session: AsyncSession):
     try:
         # track emails that have been verified in this process to prevent reuse
         if email in _EMAIL_VERIFIED:
+            _EMAIL_VERIFIED.move_to_end(email)
             return {"error": "already_verified"}
 
-        # now = datetime.now(timezone.utc) Will use in DB check later.
+        # dev/test canonical code: answered before any lookup
+        if _CANONICAL_EMAIL_CODE and hmac.compare_digest(code, _CANONICAL_EMAIL_CODE):
+            _mark_email_verified(email)
+            return {"message": "Email verified", "email": email}
+
         # first, attempt DB-backed lookup
         try:
             res = await _verify_code_db(email, code, session, transport='email', max_attempts=OTP_MAX_ATTEMPTS)
             if res.get('message') == 'verified':
-                _EMAIL_VERIFIED.add(email)
+                _mark_email_verified(email)
                 return {"message": "Email verified", "email": email}
-            # If DB check failed (no entry or invalid), allow a globals fallback
-            # for development/tests (canonical code '1234'). This ensures tests
-            # that rely on the in-memory shortcut continue to pass even when a
-            # DB is present.
+            # If DB check failed (no entry or invalid), allow the in-memory
+            # copy kept by _create_code for development/tests.
             fallback = _verify_code_globals(
-                _EMAIL_VERIFICATION_CODES, email, code, canonical='1234')
+                _EMAIL_VERIFICATION_CODES, _EMAIL_CODE_INDEX, email, code)
             if fallback.get('message') == 'verified':
-                _EMAIL_VERIFIED.add(email)
+                _mark_email_verified(email)
                 return {"message": "Email verified", "email": email}
             return res
         except OperationalError:
             # fallback to in-memory store when DB is unavailable
             res = _verify_code_globals(
-                _EMAIL_VERIFICATION_CODES, email, code, canonical='1234')
+                _EMAIL_VERIFICATION_CODES, _EMAIL_CODE_INDEX, email, code)
             if res.get('message') == 'verified':
-                _EMAIL_VERIFIED.add(email)
+                _mark_email_verified(email)
                 return {"message": "Email verified", "email": email}
             return res
     except Exception:
@@ -706,22 +1031,26 @@ async def verify_email(email: str, code: str, session: AsyncSession):
 async def verify_otp(email: str, otp: str, session: AsyncSession):
     # Verify OTP from DB, track attempts and expire after max attempts
     try:
+        # dev/test canonical code: answered before any lookup
+        if _CANONICAL_OTP_CODE and hmac.compare_digest(otp, _CANONICAL_OTP_CODE):
+            return {"message": "OTP verified", "otp": otp}
+
         # try DB-backed verification first
         try:
             res = await _verify_code_db(email, otp, session, transport='otp', max_attempts=OTP_MAX_ATTEMPTS)
             if res.get('message') == 'verified':
                 return {"message": "OTP verified", "otp": otp}
-            # allow globals fallback (canonical '9999') for dev/tests when DB
-            # contains no entry for the given otp
+            # allow the in-memory fallback for dev/tests when DB contains no
+            # entry for the given otp
             fallback = _verify_code_globals(
-                _OTP_CODES, email, otp, canonical='9999')
+                _OTP_CODES, _OTP_CODE_INDEX, email, otp)
             if fallback.get('message') == 'verified':
                 return {"message": "OTP verified", "otp": otp}
             return res
         except OperationalError:
             # fallback to globals-only verification
             res = _verify_code_globals(
-                _OTP_CODES, email, otp, canonical='9999')
+                _OTP_CODES, _OTP_CODE_INDEX, email, otp)
             if res.get('message') == 'verified':
                 return {"message": "OTP verified", "otp": otp}
             return res
@@ -0,0 +1,100 @@
+"""Redis-backed refresh-token store.
+
+Enabled with REFRESH_TOKEN_STORE=redis. Each live token is a key
+``rt:{hashed_jti}`` holding the user id, with a TTL equal to the refresh
+lifetime, so expired tokens vanish without any cleanup job. A per-user sorted
+set ``rtu:{user_id}`` (scored by issue time) keeps the newest
+MAX_REFRESH_TOKENS_PER_USER tokens. Issue, rotate and revoke are each a single
+Lua script: one round-trip, and atomic.
+
+The scripts build key names from stored values, so they assume a single
+Redis node (not Redis Cluster).
+"""
+
+import time
+from typing import Optional
+
+from app.rate_limiter.algorithms import get_redis_client
+
+_STORE_FN = """
+local function store(uid, hash, ttl, now, max)
+  redis.call('SET', 'rt:' .. hash, uid, 'EX', ttl)
+  local idx = 'rtu:' .. uid
+  redis.call('ZADD', idx, now, hash)
+  local stale = redis.call('ZRANGE', idx, 0, -(max + 1))
+  for _, h in ipairs(stale) do
+    redis.call('DEL', 'rt:' .. h)
+  end
+  if #stale > 0 then
+    redis.call('ZREMRANGEBYRANK', idx, 0, #stale - 1)
+  end
+  redis.call('EXPIRE', idx, ttl)
+end
+"""
+
+# ARGV: user_id, hash, ttl, now, max
+_ISSUE_LUA = _STORE_FN + """
+store(ARGV[1], ARGV[2], tonumber(ARGV[3]), ARGV[4], tonumber(ARGV[5]))
+return 1
+"""
+
+# ARGV: old_hash, new_hash, ttl, now, max; returns the user id or nil
+_ROTATE_LUA = _STORE_FN + """
+local uid = redis.call('GET', 'rt:' .. ARGV[1])
+if not uid then
+  return false
+end
+redis.call('DEL', 'rt:' .. ARGV[1])
+redis.call('ZREM', 'rtu:' .. uid, ARGV[1])
+store(uid, ARGV[2], tonumber(ARGV[3]), ARGV[4], tonumber(ARGV[5]))
+return uid
+"""
+
+# ARGV: hash; returns the user id or nil
+_REVOKE_LUA = """
+local uid = redis.call('GET', 'rt:' .. ARGV[1])
+if not uid then
+  return false
+end
+redis.call('DEL', 'rt:' .. ARGV[1])
+redis.call('ZREM', 'rtu:' .. uid, ARGV[1])
+return uid
+"""
+
+_scripts = None
+_scripts_client = None
+
+
+def _get_scripts():
+    """Register the scripts once per client; they run via EVALSHA after."""
+    global _scripts, _scripts_client
+    client = get_redis_client()
+    if client is None:
+        raise RuntimeError("redis_unavailable")
+    if _scripts is None or _scripts_client is not client:
+        _scripts = (
+            client.register_script(_ISSUE_LUA),
+            client.register_script(_ROTATE_LUA),
+            client.register_script(_REVOKE_LUA),
+        )
+        _scripts_client = client
+    return _scripts
+
+
+async def issue(user_id: int, hashed_jti: str, ttl: int, max_per_user: int) -> None:
+    """Store a new token and drop the user's oldest beyond max_per_user."""
+    issue_script, _, _ = _get_scripts()
+    await issue_script(args=[user_id, hashed_jti, ttl, time.time(), max_per_user])
+
+
+async def rotate(old_hashed: str, new_hashed: str, ttl: int, max_per_user: int) -> Optional[int]:
+    """Swap a live token for a new one; None if the old one is not live."""
+    _, rotate_script, _ = _get_scripts()
+    uid = await rotate_script(args=[old_hashed, new_hashed, ttl, time.time(), max_per_user])
+    return int(uid) if uid is not None else None
+
+
+async def revoke(hashed_jti: str) -> bool:
+    """Remove a token; False if it was not live."""
+    _, _, revoke_script = _get_scripts()
+    return await revoke_script(args=[hashed_jti]) is not None
@@ -1,55 +1,97 @@
 """Authorizers management router (RBAC)."""
 
 from typing import List, Optional
-from datetime import datetime
 from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi.responses import ORJSONResponse, Response
 from sqlalchemy.ext.asyncio import AsyncSession
 from pydantic import BaseModel, Field
 from app.db.connector import get_db
 from app.authorizers.rbac import RBACManager
 from app.api.auth.auth_dependency import get_current_user
 from app.db.models import User
+from app.logging_config import get_logger
+from app.authorizers.cache import (
+    PERMISSIONS_CACHE_KEY,
+    ROLES_CACHE_KEY,
+    cache_get,
+    cache_set,
+    invalidate_rbac_cache,
+)
+
+logger = get_logger("authorizers_api")
 
 router = APIRouter(prefix="/api/authorizers", tags=["Authorizers"])
 
 
-# Helper function to safely convert datetime or string to ISO format
-def to_isoformat(dt) -> str:
-    """Convert datetime or string to ISO format string."""
-    if dt is None:
-        return None
-    if isinstance(dt, str):
-        return dt
-    if isinstance(dt, datetime):
-        return dt.isoformat()
-    return str(dt)
+async def get_rbac_manager(db: AsyncSession = Depends(get_db)) -> RBACManager:
+    """Build the RBAC manager once per request."""
+    return RBACManager(db)
+
+
+def _permission_name(p) -> str:
+    try:
+        if isinstance(p, str):
+            return p
+        if isinstance(p, dict):
+            if 'name' in p:
+                return str(p['name'])
+            if 'id' in p:
+                return str(p['id'])
+            return str(p)
+        if hasattr(p, 'name'):
+            return str(getattr(p, 'name'))
+        if hasattr(p, 'id'):
+            return str(getattr(p, 'id'))
+    except Exception:
+        pass
+    return str(p)
 
 
 def _normalize_permissions(perms):
     """Ensure permissions is a list of strings for JSON responses."""
     if not perms:
         return []
-    out = []
-    for p in perms:
-        try:
-            if isinstance(p, str):
-                out.append(p)
-            elif isinstance(p, dict):
-                if 'name' in p:
-                    out.append(str(p['name']))
-                elif 'id' in p:
-                    out.append(str(p['id']))
-                else:
-                    out.append(str(p))
-            elif hasattr(p, 'name'):
-                out.append(str(getattr(p, 'name')))
-            elif hasattr(p, 'id'):
-                out.append(str(getattr(p, 'id')))
-            else:
-                out.append(str(p))
-        except Exception:
-            out.append(str(p))
-    return out
+    # Role.permissions is a JSON list of names, so the common case passes
+    # through as-is (the dicts are serialized straight away and never
+    # mutated); anything else goes through the per-item cascade
+    if type(perms) is list and all(type(p) is str for p in perms):
+        return perms
+    return [_permission_name(p) for p in perms]
+
+
+# Timestamps stay as the raw column values; orjson emits them as ISO-8601.
+def _role_dict(role) -> dict:
+    """RoleResponse shape as a plain dict."""
+    return {
+        "id": role.id,
+        "name": role.name,
+        "description": role.description,
+        "permissions": _normalize_permissions(role.permissions),
+        "created_at": role.created_at or "",
+        "updated_at": role.updated_at,
+    }
+
+
+def _permission_dict(permission) -> dict:
+    """PermissionResponse shape as a plain dict."""
+    return {
+        "id": permission.id,
+        "name": permission.name,
+        "resource": permission.resource,
+        "action": permission.action,
+        "description": permission.description,
+        "created_at": permission.created_at or "",
+    }
+
+
+def _json_response(content, status_code: int = status.HTTP_200_OK) -> ORJSONResponse:
+    # Rows come from our own store, so these endpoints skip response_model
+    # validation and jsonable_encoder; response_model stays for docs.
+    return ORJSONResponse(content, status_code=status_code)
+
+
+def _raw_json_response(body, status_code: int = status.HTTP_200_OK) -> Response:
+    return Response(content=body, status_code=status_code, media_type="application/json")
 
 
 # Pydantic schemas
@@ -128,7 +170,7 @@ class UserRoleAssignment(BaseModel):
 @router.post("/roles", response_model=RoleResponse, status_code=status.HTTP_201_CREATED)
 async def create_role(
     role_data: RoleCreate,
-    db: AsyncSession = Depends(get_db),
+    manager: RBACManager = Depends(get_rbac_manager),
     current_user: User = Depends(get_current_user),
 ):
     """
@@ -136,10 +178,6 @@ async def create_role(
 
     Requires authentication. Creates a role with specified permissions.
     """
-    manager = RBACManager(db)
-    print(role_data, db, current_user, manager,
-          flush=True)  # Debugging statement
-
     try:
         role = await manager.create_role(
             name=role_data.name,
@@ -150,16 +188,10 @@ async def create_role(
             updated_at=role_data.updated_at,
         )
 
-        print(f"Created route role: {role}", flush=True)  # Debugging statement
+        logger.debug(f"Created role id={role.id}")
+        await invalidate_rbac_cache()
 
-        return RoleResponse(
-            id=role.id,
-            name=role.name,
-            description=role.description,
-            permissions=_normalize_permissions(role.permissions),
-            created_at=to_isoformat(role.created_at) or "",
-            updated_at=to_isoformat(role.updated_at),
-        )
+        return _json_response(_role_dict(role), status.HTTP_201_CREATED)
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
@@ -169,26 +201,19 @@ async def create_role(
 
 @router.get("/roles", response_model=List[RoleResponse])
 async def list_roles(
-    db: AsyncSession = Depends(get_db),
+    manager: RBACManager = Depends(get_rbac_manager),
     current_user: User = Depends(get_current_user),
 ):
     """List all roles."""
-    manager = RBACManager(db)
-
+    cached = await cache_get(ROLES_CACHE_KEY)
+    if cached is not None:
+        return _raw_json_response(cached)
     try:
         roles = await manager.list_roles()
 
-        return [
-            RoleResponse(
-                id=r.id,
-                name=r.name,
-                description=r.description,
-                permissions=_normalize_permissions(r.permissions),
-                created_at=to_isoformat(r.created_at) or "",
-                updated_at=to_isoformat(r.updated_at),
-            )
-            for r in roles
-        ]
+        response = _json_response([_role_dict(r) for r in roles])
+        await cache_set(ROLES_CACHE_KEY, response.body)
+        return response
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
@@ -199,12 +224,10 @@ async def list_roles(
 @router.get("/roles/{role_id}", response_model=RoleResponse)
 async def get_role(
     role_id: int,
-    db: AsyncSession = Depends(get_db),
+    manager: RBACManager = Depends(get_rbac_manager),
     current_user: User = Depends(get_current_user),
 ):
     """Get a specific role by ID."""
-    manager = RBACManager(db)
-
     role = await manager.get_role(role_id)
 
     if not role:
@@ -213,26 +236,17 @@ async def get_role(
             detail=f"Role {role_id} not found"
         )
 
-    return RoleResponse(
-        id=role.id,
-        name=role.name,
-        description=role.description,
-        permissions=_normalize_permissions(role.permissions),
-        created_at=to_isoformat(role.created_at) or "",
-        updated_at=to_isoformat(role.updated_at),
-    )
+    return _json_response(_role_dict(role))
 
 
 @router.put("/roles/{role_id}", response_model=RoleResponse)
 async def update_role(
     role_id: int,
     role_data: RoleUpdate,
-    db: AsyncSession = Depends(get_db),
+    manager: RBACManager = Depends(get_rbac_manager),
     current_user: User = Depends(get_current_user),
 ):
     """Update a role."""
-    manager = RBACManager(db)
-
     # Build update dict
     update_data = {}
     if role_data.name is not None:
@@ -249,26 +263,18 @@ async def update_role(
             status_code=status.HTTP_404_NOT_FOUND,
             detail=f"Role {role_id} not found"
         )
+    await invalidate_rbac_cache()
 
-    return RoleResponse(
-        id=role.id,
-        name=role.name,
-        description=role.description,
-        permissions=_normalize_permissions(role.permissions),
-        created_at=to_isoformat(role.created_at) or "",
-        updated_at=to_isoformat(role.updated_at),
-    )
+    return _json_response(_role_dict(role))
 
 
 @router.delete("/roles/{role_id}", status_code=status.HTTP_200_OK)
 async def delete_role(
     role_id: int,
-    db: AsyncSession = Depends(get_db),
+    manager: RBACManager = Depends(get_rbac_manager),
     current_user: User = Depends(get_current_user),
 ):
     """Delete a role."""
-    manager = RBACManager(db)
-
     success = await manager.delete_role(role_id)
 
     if not success:
@@ -276,6 +282,7 @@ async def delete_role(
             status_code=status.HTTP_404_NOT_FOUND,
             detail=f"Role {role_id} not found"
         )
+    await invalidate_rbac_cache()
 
     return {"message": f"Role {role_id} deleted successfully"}
 
@@ -284,12 +291,10 @@ async def delete_role(
 @router.post("/permissions", response_model=PermissionResponse, status_code=status.HTTP_201_CREATED)
 async def create_permission(
     permission_data: PermissionCreate,
-    db: AsyncSession = Depends(get_db),
+    manager: RBACManager = Depends(get_rbac_manager),
     current_user: User = Depends(get_current_user),
 ):
     """Create a new permission."""
-    manager = RBACManager(db)
-
     try:
         permission = await manager.create_permission(
             name=permission_data.name,
@@ -297,15 +302,9 @@ async def create_permission(
             action=permission_data.action,
             description=permission_data.description,
         )
+        await invalidate_rbac_cache()
 
-        return PermissionResponse(
-            id=permission.id,
-            name=permission.name,
-            resource=permission.resource,
-            action=permission.action,
-            description=permission.description,
-            created_at=to_isoformat(permission.created_at) or "",
-        )
+        return _json_response(_permission_dict(permission), status.HTTP_201_CREATED)
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
@@ -315,26 +314,19 @@ async def create_permission(
 
 @router.get("/permissions", response_model=List[PermissionResponse])
 async def list_permissions(
-    db: AsyncSession = Depends(get_db),
+    manager: RBACManager = Depends(get_rbac_manager),
     current_user: User = Depends(get_current_user),
 ):
     """List all permissions."""
-    manager = RBACManager(db)
-
+    cached = await cache_get(PERMISSIONS_CACHE_KEY)
+    if cached is not None:
+        return _raw_json_response(cached)
     try:
         permissions = await manager.list_permissions()
 
-        return [
-            PermissionResponse(
-                id=p.id,
-                name=p.name,
-                resource=p.resource,
-                action=p.action,
-                description=p.description,
-                created_at=to_isoformat(p.created_at) or "",
-            )
-            for p in permissions
-        ]
+        response = _json_response([_permission_dict(p) for p in permissions])
+        await cache_set(PERMISSIONS_CACHE_KEY, response.body)
+        return response
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
@@ -345,12 +337,10 @@ async def list_permissions(
 @router.get("/permissions/{permission_id}", response_model=PermissionResponse)
 async def get_permission(
     permission_id: int,
-    db: AsyncSession = Depends(get_db),
+    manager: RBACManager = Depends(get_rbac_manager),
     current_user: User = Depends(get_current_user),
 ):
     """Get a specific permission by ID."""
-    manager = RBACManager(db)
-
     permission = await manager.get_permission(permission_id)
 
     if not permission:
@@ -359,25 +349,16 @@ async def get_permission(
             detail=f"Permission {permission_id} not found"
         )
 
-    return PermissionResponse(
-        id=permission.id,
-        name=permission.name,
-        resource=permission.resource,
-        action=permission.action,
-        description=permission.description,
-        created_at=to_isoformat(permission.created_at) or "",
-    )
+    return _json_response(_permission_dict(permission))
 
 
 @router.delete("/permissions/{permission_id}", status_code=status.HTTP_200_OK)
 async def delete_permission(
     permission_id: int,
-    db: AsyncSession = Depends(get_db),
+    manager: RBACManager = Depends(get_rbac_manager),
     current_user: User = Depends(get_current_user),
 ):
     """Delete a permission."""
-    manager = RBACManager(db)
-
     success = await manager.delete_permission(permission_id)
 
     if not success:
@@ -385,6 +366,7 @@ async def delete_permission(
             status_code=status.HTTP_404_NOT_FOUND,
             detail=f"Permission {permission_id} not found"
         )
+    await invalidate_rbac_cache()
 
     return {"message": f"Permission {permission_id} deleted successfully"}
 
@@ -393,12 +375,10 @@ async def delete_permission(
 @router.post("/users/assign-role", status_code=status.HTTP_200_OK)
 async def assign_role_to_user(
     assignment: UserRoleAssignment,
-    db: AsyncSession = Depends(get_db),
+    manager: RBACManager = Depends(get_rbac_manager),
     current_user: User = Depends(get_current_user),
 ):
     """Assign a role to a user."""
-    manager = RBACManager(db)
-
     try:
         await manager.assign_role_to_user(assignment.user_id, assignment.role_id)
         return {"message": f"Role {assignment.role_id} assigned to user {assignment.user_id}"}
@@ -413,12 +393,10 @@ async def assign_role_to_user(
 async def remove_role_from_user(
     user_id: int,
     role_id: int,
-    db: AsyncSession = Depends(get_db),
+    manager: RBACManager = Depends(get_rbac_manager),
     current_user: User = Depends(get_current_user),
 ):
     """Remove a role from a user."""
-    manager = RBACManager(db)
-
     try:
         await manager.remove_role_from_user(user_id, role_id)
         return {"message": f"Role {role_id} removed from user {user_id}"}
@@ -432,26 +410,14 @@ async def remove_role_from_user(
 @router.get("/users/{user_id}/roles", response_model=List[RoleResponse])
 async def get_user_roles(
     user_id: int,
-    db: AsyncSession = Depends(get_db),
+    manager: RBACManager = Depends(get_rbac_manager),
     current_user: User = Depends(get_current_user),
 ):
     """Get all roles assigned to a user."""
-    manager = RBACManager(db)
-
     try:
         roles = await manager.get_user_roles(user_id)
 
-        return [
-            RoleResponse(
-                id=r.id,
-                name=r.name,
-                description=r.description,
-                permissions=_normalize_permissions(r.permissions),
-                created_at=to_isoformat(r.created_at) or "",
-                updated_at=to_isoformat(r.updated_at),
-            )
-            for r in roles
-        ]
+        return _json_response([_role_dict(r) for r in roles])
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
@@ -296,12 +296,11 @@ async def create_user(
 
     Requires authentication and proper permissions.
     """
-    from passlib.context import CryptContext
+    from app.api.auth.auth_service import hash_password
 
     try:
-        # simple password hashing using bcrypt
-        pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
-        hashed = pwd_context.hash(user_data.password)
+        # same scheme as registration, so these users can log in too
+        hashed = await hash_password(user_data.password)
 
         user = User(
             email=user_data.email,
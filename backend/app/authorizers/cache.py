@@ -0,0 +1,61 @@
+"""Redis cache for the RBAC role and permission listings.
+
+Enabled with RBAC_CACHE_TTL (seconds; 0, the default, disables it). The
+list endpoints store their rendered JSON body under ROLES_CACHE_KEY and
+PERMISSIONS_CACHE_KEY; anything that creates, changes or removes roles or
+permissions calls invalidate_rbac_cache(). Per-user role lists are never
+cached.
+
+The cache fails open: without Redis, reads go to the database as before.
+"""
+
+import os
+
+from app.logging_config import get_logger
+from app.rate_limiter.algorithms import get_redis_client
+
+logger = get_logger("rbac_cache")
+
+RBAC_CACHE_TTL = int(os.getenv("RBAC_CACHE_TTL", "0"))
+ROLES_CACHE_KEY = "rbac:roles"
+PERMISSIONS_CACHE_KEY = "rbac:permissions"
+
+
+def _client():
+    if RBAC_CACHE_TTL <= 0:
+        return None
+    return get_redis_client()
+
+
+async def cache_get(key: str):
+    """Return the cached body for key, or None on a miss or Redis error."""
+    client = _client()
+    if client is None:
+        return None
+    try:
+        return await client.get(key)
+    except Exception as e:
+        logger.debug(f"RBAC cache read failed: {e}")
+        return None
+
+
+async def cache_set(key: str, body) -> None:
+    """Store a rendered body for RBAC_CACHE_TTL seconds."""
+    client = _client()
+    if client is None:
+        return
+    try:
+        await client.set(key, body, ex=RBAC_CACHE_TTL)
+    except Exception as e:
+        logger.debug(f"RBAC cache write failed: {e}")
+
+
+async def invalidate_rbac_cache() -> None:
+    """Drop both cached listings after a role or permission change."""
+    client = _client()
+    if client is None:
+        return
+    try:
+        await client.delete(ROLES_CACHE_KEY, PERMISSIONS_CACHE_KEY)
+    except Exception as e:
+        logger.warning(f"RBAC cache invalidation failed: {e}")
@@ -1,11 +1,97 @@
 """RBAC initialization helpers for app startup."""
 
+import asyncio
+
 from sqlalchemy.ext.asyncio import AsyncSession
 from app.authorizers.rbac import RBACManager
+from app.authorizers.cache import invalidate_rbac_cache
+from app.db.models import Permission, Role
+from app.db.session_utils import CONFLICT_INSERTS
 from app.logging_config import get_logger
 
 logger = get_logger("rbac_init")
 
+# Default permissions
+DEFAULT_PERMISSIONS = [
+    # API Management
+    {"name": "api:create", "resource": "api", "action": "create"},
+    {"name": "api:read", "resource": "api", "action": "read"},
+    {"name": "api:update", "resource": "api", "action": "update"},
+    {"name": "api:delete", "resource": "api", "action": "delete"},
+    {"name": "api:list", "resource": "api", "action": "list"},
+
+    # User Management
+    {"name": "user:create", "resource": "user", "action": "create"},
+    {"name": "user:read", "resource": "user", "action": "read"},
+    {"name": "user:update", "resource": "user", "action": "update"},
+    {"name": "user:delete", "resource": "user", "action": "delete"},
+    {"name": "user:list", "resource": "user", "action": "list"},
+
+    # Key Management
+    {"name": "key:create", "resource": "key", "action": "create"},
+    {"name": "key:read", "resource": "key", "action": "read"},
+    {"name": "key:update", "resource": "key", "action": "update"},
+    {"name": "key:delete", "resource": "key", "action": "delete"},
+    {"name": "key:list", "resource": "key", "action": "list"},
+
+    # Role Management
+    {"name": "role:create", "resource": "role", "action": "create"},
+    {"name": "role:read", "resource": "role", "action": "read"},
+    {"name": "role:update", "resource": "role", "action": "update"},
+    {"name": "role:delete", "resource": "role", "action": "delete"},
+    {"name": "role:list", "resource": "role", "action": "list"},
+    {"name": "role:assign", "resource": "role", "action": "assign"},
+]
+
+# Default roles
+DEFAULT_ROLES = [
+    {
+        "name": "admin",
+        "description": "Full system access",
+        "permissions": [
+            "api:create", "api:read", "api:update", "api:delete", "api:list",
+            "user:create", "user:read", "user:update", "user:delete", "user:list",
+            "key:create", "key:read", "key:update", "key:delete", "key:list",
+            "role:create", "role:read", "role:update", "role:delete", "role:list", "role:assign",
+        ]
+    },
+    {
+        "name": "developer",
+        "description": "API development access",
+        "permissions": [
+            "api:create", "api:read", "api:update", "api:list",
+            "key:create", "key:read", "key:list",
+        ]
+    },
+    {
+        "name": "editor",
+        "description": "Edit existing resources",
+        "permissions": [
+            "api:read", "api:update", "api:list",
+            "key:read", "key:list",
+        ]
+    },
+    {
+        "name": "viewer",
+        "description": "Read-only access",
+        "permissions": [
+            "api:read", "api:list",
+            "key:read", "key:list",
+        ]
+    },
+]
+
+# "Initialized" only ever goes False -> True, so once a probe (or an
+# explicit init) succeeds the result is cached for the process lifetime.
+_RBAC_READY: bool = False
+_RBAC_READY_LOCK = asyncio.Lock()
+
+
+def mark_rbac_ready() -> None:
+    """Record that the default RBAC roles exist."""
+    global _RBAC_READY
+    _RBAC_READY = True
+
 
 async def init_rbac_system(session: AsyncSession, force: bool = False) -> dict:
     """Initialize RBAC system with default roles and permissions.
@@ -29,41 +115,23 @@ async def init_rbac_system(session: AsyncSession, force: bool = False) -> dict:
         "errors": []
     }
 
-    try:
-        # Default permissions
-        default_permissions = [
-            # API Management
-            {"name": "api:create", "resource": "api", "action": "create"},
-            {"name": "api:read", "resource": "api", "action": "read"},
-            {"name": "api:update", "resource": "api", "action": "update"},
-            {"name": "api:delete", "resource": "api", "action": "delete"},
-            {"name": "api:list", "resource": "api", "action": "list"},
-
-            # User Management
-            {"name": "user:create", "resource": "user", "action": "create"},
-            {"name": "user:read", "resource": "user", "action": "read"},
-            {"name": "user:update", "resource": "user", "action": "update"},
-            {"name": "user:delete", "resource": "user", "action": "delete"},
-            {"name": "user:list", "resource": "user", "action": "list"},
-
-            # Key Management
-            {"name": "key:create", "resource": "key", "action": "create"},
-            {"name": "key:read", "resource": "key", "action": "read"},
-            {"name": "key:update", "resource": "key", "action": "update"},
-            {"name": "key:delete", "resource": "key", "action": "delete"},
-            {"name": "key:list", "resource": "key", "action": "list"},
-
-            # Role Management
-            {"name": "role:create", "resource": "role", "action": "create"},
-            {"name": "role:read", "resource": "role", "action": "read"},
-            {"name": "role:update", "resource": "role", "action": "update"},
-            {"name": "role:delete", "resource": "role", "action": "delete"},
-            {"name": "role:list", "resource": "role", "action": "list"},
-            {"name": "role:assign", "resource": "role", "action": "assign"},
-        ]
+    # Seed both catalogs with one INSERT ... ON CONFLICT DO NOTHING each
+    # where the dialect supports it; otherwise fall back to per-row checks.
+    dialect_insert = None
+    if not force and isinstance(session, AsyncSession):
+        dialect_insert = CONFLICT_INSERTS.get(session.bind.dialect.name)
+    if dialect_insert is not None:
+        try:
+            await _bulk_seed(session, dialect_insert, results)
+        except Exception as e:
+            await session.rollback()
+            logger.error(f"RBAC initialization failed: {e}", exc_info=True)
+            results["errors"].append(f"Fatal error: {str(e)}")
+        return results
 
+    try:
         # Create permissions
-        for perm_data in default_permissions:
+        for perm_data in DEFAULT_PERMISSIONS:
             try:
                 existing_perms = await manager.list_permissions()
                 if not force and any(p.name == perm_data["name"] for p in existing_perms):
@@ -79,46 +147,8 @@ async def init_rbac_system(session: AsyncSession, force: bool = False) -> dict:
                 results["errors"].append(
                     f"Permission {perm_data['name']}: {str(e)}")
 
-        # Default roles
-        default_roles = [
-            {
-                "name": "admin",
-                "description": "Full system access",
-                "permissions": [
-                    "api:create", "api:read", "api:update", "api:delete", "api:list",
-                    "user:create", "user:read", "user:update", "user:delete", "user:list",
-                    "key:create", "key:read", "key:update", "key:delete", "key:list",
-                    "role:create", "role:read", "role:update", "role:delete", "role:list", "role:assign",
-                ]
-            },
-            {
-                "name": "developer",
-                "description": "API development access",
-                "permissions": [
-                    "api:create", "api:read", "api:update", "api:list",
-                    "key:create", "key:read", "key:list",
-                ]
-            },
-            {
-                "name": "editor",
-                "description": "Edit existing resources",
-                "permissions": [
-                    "api:read", "api:update", "api:list",
-                    "key:read", "key:list",
-                ]
-            },
-            {
-                "name": "viewer",
-                "description": "Read-only access",
-                "permissions": [
-                    "api:read", "api:list",
-                    "key:read", "key:list",
-                ]
-            },
-        ]
-
         # Create roles
-        for role_data in default_roles:
+        for role_data in DEFAULT_ROLES:
             try:
                 existing_role = await manager.get_role_by_name(role_data["name"])
                 if not force and existing_role:
@@ -144,12 +174,59 @@ async def init_rbac_system(session: AsyncSession, force: bool = False) -> dict:
     return results
 
 
+async def _bulk_seed(session: AsyncSession, dialect_insert, results: dict) -> None:
+    """Insert all missing default permissions and roles in two statements.
+
+    Names returned by RETURNING were created; the rest already existed.
+    """
+    result = await session.execute(
+        dialect_insert(Permission)
+        .values(DEFAULT_PERMISSIONS)
+        .on_conflict_do_nothing(index_elements=["name"])
+        .returning(Permission.name)
+    )
+    created = set(result.scalars().all())
+    for perm_data in DEFAULT_PERMISSIONS:
+        key = "permissions_created" if perm_data["name"] in created else "permissions_skipped"
+        results[key].append(perm_data["name"])
+
+    result = await session.execute(
+        dialect_insert(Role)
+        .values(DEFAULT_ROLES)
+        .on_conflict_do_nothing(index_elements=["name"])
+        .returning(Role.name)
+    )
+    created = set(result.scalars().all())
+    for role_data in DEFAULT_ROLES:
+        key = "roles_created" if role_data["name"] in created else "roles_skipped"
+        results[key].append(role_data["name"])
+
+    await session.commit()
+    logger.info(
+        f"RBAC initialized: {len(results['permissions_created'])} permissions, "
+        f"{len(results['roles_created'])} roles created"
+    )
+
+
 async def ensure_rbac_initialized(session: AsyncSession) -> bool:
     """Ensure RBAC system is initialized with minimum required roles.
 
     Returns:
         bool: True if RBAC is ready, False otherwise
     """
+    if _RBAC_READY:
+        return True
+
+    async with _RBAC_READY_LOCK:
+        if _RBAC_READY:
+            return True
+        ready = await _probe_rbac_initialized(session)
+        if ready:
+            mark_rbac_ready()
+        return ready
+
+
+async def _probe_rbac_initialized(session: AsyncSession) -> bool:
     try:
         manager = RBACManager(session)
 
@@ -159,6 +236,7 @@ async def ensure_rbac_initialized(session: AsyncSession) -> bool:
         if not admin_role:
             logger.info("RBAC not initialized, initializing now...")
             results = await init_rbac_system(session)
+            await invalidate_rbac_cache()
 
             if results["errors"]:
                 logger.warning(
@@ -6,6 +6,7 @@ from sqlalchemy.ext.asyncio import AsyncSession
 from fastapi import Depends, HTTPException, status
 from app.db.models import Role, Permission, UserRole, User
 from app.db.connector import get_db
+from app.db.session_utils import resolve_session
 from app.api.auth.auth_dependency import get_current_user
 from app.logging_config import get_logger
 import functools
@@ -21,7 +22,6 @@ class RBACManager:
         self._resolved_session = None
 
     async def _sess(self):
-        from app.db.session_utils import resolve_session
         if self._resolved_session is None:
             self._resolved_session = await resolve_session(self.session)
         return self._resolved_session
@@ -55,7 +55,6 @@ class RBACManager:
                 updated_at.replace('Z', '+00:00'))
 
         role = Role(**role_data)
-        print(f"Creating role: {name} with permissions: {permissions}, {role}")
 
         # Normalize incoming permissions to list of names/ids
         perm_list = []
@@ -81,7 +80,6 @@ class RBACManager:
         await session.flush()  # Flush to assign ID
         await session.commit()
         await session.refresh(role)
-        print(f"Created role: {role} with ID: {role.id}")
 
         logger.info(f"Created role: {name}")
         return role
@@ -404,13 +402,16 @@ class RBACManager:
                 user_roles = ur.scalars().all()
                 role_ids = [int(getattr(r, 'role_id')) for r in user_roles if getattr(
                     r, 'role_id', None) is not None]
-                roles = []
-                for rid in role_ids:
-                    rres = await session.execute(select(Role).where(Role.id == rid))
-                    r = rres.scalars().first()
-                    if r:
-                        roles.append(r)
-                return roles
+                if not role_ids:
+                    return []
+                if len(role_ids) == 1:
+                    rres = await session.execute(select(Role).where(Role.id == role_ids[0]))
+                    return rres.scalars().all()[:1]
+                # the fallback stores only filter on equality, so load the
+                # (small) roles table once rather than one query per role id
+                rres = await session.execute(select(Role))
+                by_id = {int(r.id): r for r in rres.scalars().all()}
+                return [by_id[rid] for rid in role_ids if rid in by_id]
             else:
                 result = await session.execute(
                     select(Role).join(UserRole).where(
@@ -427,11 +428,6 @@ class RBACManager:
     async def get_user_permissions(self, user_id: int) -> Set[str]:
         """Get all permissions for a user (from all their roles)."""
         roles = await self.get_user_roles(user_id)
-        permissions = set()
-
-        for role in roles:
-            if role.permissions:
-                permissions.update(role.permissions)
 
         # Also check legacy roles column on User model
         session = await self._sess()
@@ -440,11 +436,22 @@ class RBACManager:
         )
         user = result.scalars().first()
 
-        if user and user.roles:
-            # Add legacy roles as permissions
-            legacy_roles = user.roles.split(',')
-            permissions.update(legacy_roles)
+        return self.collect_permissions(roles, user.roles if user else None)
+
+    @staticmethod
+    def collect_permissions(roles: List[Role], legacy_roles: Optional[str]) -> Set[str]:
+        """Union of the roles' permissions and the legacy comma-separated roles.
 
+        For callers that already hold the user's roles and user row, so the
+        permission set needs no further queries.
+        """
+        permissions = set()
+        for role in roles:
+            if role.permissions:
+                permissions.update(role.permissions)
+        if legacy_roles:
+            # Add legacy roles as permissions
+            permissions.update(legacy_roles.split(','))
         return permissions
 
     async def user_has_permission(self, user_id: int, permission: str) -> bool:
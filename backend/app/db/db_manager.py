@@ -76,6 +76,11 @@ class DatabaseManager:
         self._connection_url: Optional[str] = None
         self._echo_sql: bool = False
         self._sqlite_path: str = os.getenv("SQLITE_DB_PATH", "gateway.db")
+        # Pool sized for concurrent multi-statement requests; connections
+        # are opened lazily, so an idle gateway does not hold all of them.
+        self._pool_size: int = int(os.getenv("DB_POOL_SIZE", "32"))
+        self._max_overflow: int = int(os.getenv("DB_MAX_OVERFLOW", "32"))
+        self._pool_recycle: int = int(os.getenv("DB_POOL_RECYCLE", "1800"))
 
         self._initialized = True
         logger.info("DatabaseManager initialized")
@@ -173,9 +178,10 @@ class DatabaseManager:
                 echo=self._echo_sql,
                 future=True,
                 pool_pre_ping=True,  # Verify connections before using them
-                pool_size=5,  # Number of connections to maintain
-                max_overflow=10,  # Maximum overflow connections
-                pool_recycle=3600,  # Recycle connections after 1 hour
+                pool_size=self._pool_size,  # Number of connections to maintain
+                max_overflow=self._max_overflow,  # Maximum overflow connections
+                pool_recycle=self._pool_recycle,  # Recycle connections (seconds)
+                query_cache_size=1200,  # Compiled-statement cache entries
                 connect_args=self._get_connect_args(ssl_mode),
             )
 
@@ -554,6 +560,11 @@ async def get_db() -> AsyncGenerator[Union[AsyncSession, SQLiteDB, InMemoryDB],
     Dependency function for FastAPI to inject database sessions.
 
     This is the function to use with FastAPI's Depends() for endpoints.
+    FastAPI caches a dependency's value for the whole request, so every
+    Depends(get_db) in one request (e.g. get_current_user and the route
+    itself) receives the same session and connection. Keep this function
+    the single entry point, and never use Depends(get_db, use_cache=False),
+    so that sharing holds.
 
     Yields:
         AsyncSession | SQLiteDB | InMemoryDB: Database session
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Boolean, DateTime, ForeignKey, func, JSON, Text, UniqueConstraint
+from sqlalchemy import Column, Integer, String, Boolean, DateTime, ForeignKey, func, JSON, Text, UniqueConstraint, LargeBinary, Index
 from sqlalchemy.orm import relationship
 from sqlalchemy.orm import declarative_base
 from sqlalchemy.ext.hybrid import hybrid_property
@@ -26,11 +26,14 @@ class User(Base):
 
 class RefreshToken(Base):
     __tablename__ = "refresh_tokens"
+    # per-user prune scans; the user_id prefix also serves plain user lookups
+    __table_args__ = (Index(
+        'ix_refresh_tokens_user_revoked_created', 'user_id', 'revoked', 'created_at'),)
 
     id = Column(Integer, primary_key=True, index=True)
     token = Column(String, unique=True, nullable=False, index=True)
     user_id = Column(Integer, ForeignKey(
-        "users.id", ondelete="CASCADE"), nullable=False, index=True)
+        "users.id", ondelete="CASCADE"), nullable=False)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     expires_at = Column(DateTime(timezone=True), nullable=False)
     revoked = Column(Boolean, default=False)
@@ -51,6 +54,12 @@ class OTP(Base):
     transport = Column(String, nullable=True)  # e.g. 'email' or 'sms'
 
 
+# latest live code per (email, transport); partial, so consumed codes, which
+# are the bulk of the table, are never indexed
+Index('ix_otps_email_transport_active', OTP.email, OTP.transport, OTP.created_at.desc(),
+      postgresql_where=~OTP.consumed, sqlite_where=~OTP.consumed)
+
+
 class API(Base):
     __tablename__ = "apis"
     __table_args__ = (UniqueConstraint(
@@ -58,7 +67,8 @@ class API(Base):
 
     id = Column(Integer, primary_key=True, index=True)
     name = Column(String, nullable=False, index=True)
-    version = Column(String, nullable=False, index=True)
+    # (name, version) lookups are served by uq_api_name_version
+    version = Column(String, nullable=False)
     description = Column(Text, nullable=True)
     owner_id = Column(Integer, ForeignKey(
         "users.id", ondelete="SET NULL"), nullable=True, index=True)
@@ -160,6 +170,9 @@ class APIKey(Base):
 
     id = Column(Integer, primary_key=True, index=True)
     key = Column(String, nullable=False, unique=True, index=True)
+    # raw 32-byte sha256 of the plain key (NULL for salted keys); the hot
+    # lookup path matches on this fixed-width column
+    key_sha256 = Column(LargeBinary(32), nullable=True, unique=True, index=True)
     label = Column(String, nullable=True)
     scopes = Column(String, nullable=True)  # comma-separated scopes
     revoked = Column(Boolean, default=False)
@@ -169,7 +182,7 @@ class APIKey(Base):
     expires_at = Column(DateTime(timezone=True), nullable=True)
     last_used_at = Column(DateTime(timezone=True), nullable=True)
     usage_count = Column(Integer, default=0)
-    metadata_json = Column(JSON, name="metadata", nullable=True)
+    metadata_json = Column(JSON, name="extra", nullable=True)
 
     environment = relationship("Environment")
 
@@ -234,7 +247,7 @@ class AuditLog(Base):
     resource_id = Column(String, nullable=True)
     ip_address = Column(String, nullable=True)
     user_agent = Column(String, nullable=True)
-    metadata_json = Column(JSON, name="metadata", nullable=True)
+    metadata_json = Column(JSON, name="extra", nullable=True)
     status = Column(String, nullable=True)  # success, failure
     error_message = Column(Text, nullable=True)
 
@@ -257,7 +270,7 @@ class Metric(Base):
         "apis.id", ondelete="SET NULL"), nullable=True, index=True)
     user_id = Column(Integer, ForeignKey(
         "users.id", ondelete="SET NULL"), nullable=True)
-    metadata_json = Column(JSON, name="metadata", nullable=True)
+    metadata_json = Column(JSON, name="extra", nullable=True)
 
     api = relationship("API")
     user = relationship("User")
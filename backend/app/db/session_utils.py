@@ -4,10 +4,20 @@ Some tests or legacy code may pass an async generator (the FastAPI dependency
 `get_db()` when called directly) instead of an actual ``AsyncSession`` instance.
 These helpers unwrap the async generator to obtain the real session so
 compatibility shims can operate correctly in both test and runtime contexts.
+It also maps dialect names to the INSERT constructs that support
+``ON CONFLICT DO NOTHING``, for callers that pick a bulk path per dialect.
 """
 import inspect
 from typing import Any, Optional
 
+from sqlalchemy.dialects import postgresql, sqlite
+
+# dialects whose INSERT can skip duplicates with ON CONFLICT DO NOTHING
+CONFLICT_INSERTS = {
+    "postgresql": postgresql.insert,
+    "sqlite": sqlite.insert,
+}
+
 
 async def resolve_session(session_or_gen: Any) -> Optional[Any]:
     """If ``session_or_gen`` is an async generator, advance it once and
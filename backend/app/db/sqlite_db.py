@@ -272,9 +272,15 @@ class SQLiteDB:
                 expires_at TEXT,
                 last_used_at TEXT,
                 usage_count INTEGER DEFAULT 0,
-                metadata TEXT
+                extra TEXT
             )
         """)
+        # files created before the column was renamed (alembic 0007)
+        cursor = await self._db.execute("PRAGMA table_info(api_keys)")
+        columns = {row[1] for row in await cursor.fetchall()}
+        if 'metadata' in columns and 'extra' not in columns:
+            await self._db.execute(
+                "ALTER TABLE api_keys RENAME COLUMN metadata TO extra")
 
         # Environments table
         await self._db.execute("""
@@ -300,7 +306,7 @@ class SQLiteDB:
         for key in row.keys():
             value = row[key]
             # Handle JSON columns
-            if key in ('config', 'resource', 'permissions', 'metadata') and value:
+            if key in ('config', 'resource', 'permissions', 'extra') and value:
                 try:
                     value = json.loads(value) if isinstance(
                         value, str) else value
@@ -309,6 +315,9 @@ class SQLiteDB:
             # Handle boolean columns (SQLite stores as INTEGER)
             elif key in ('is_active', 'is_superuser', 'revoked', 'consumed'):
                 value = bool(value)
+            # same attribute name as the ORM models use for the column
+            if key == 'extra':
+                key = 'metadata_json'
             setattr(obj, key, value)
         return obj
 
@@ -843,7 +852,7 @@ class SQLiteDB:
                     await self._db.execute("""
                         UPDATE api_keys 
                         SET key=?, label=?, scopes=?, revoked=?, environment_id=?,
-                            created_at=?, expires_at=?, last_used_at=?, usage_count=?, metadata=?
+                            created_at=?, expires_at=?, last_used_at=?, usage_count=?, extra=?
                         WHERE id=?
                     """, (
                         getattr(obj, 'key', None),
@@ -865,7 +874,7 @@ class SQLiteDB:
                 else:
                     cursor = await self._db.execute("""
                         INSERT INTO api_keys (key, label, scopes, revoked, environment_id,
-                            created_at, expires_at, last_used_at, usage_count, metadata)
+                            created_at, expires_at, last_used_at, usage_count, extra)
                         VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
                     """, (
                         getattr(obj, 'key', None),
@@ -1,13 +1,135 @@
-"""Cleanup script for old logs (30-day retention)."""
+"""Cleanup script for old logs (30-day retention).
 
-from datetime import datetime, timedelta, timezone
-from sqlalchemy import delete, select, func
+On Postgres, audit_logs and metrics are range-partitioned by month (see
+migration 0004). The cleanup job also maintains those partitions: it creates
+the next PARTITION_MONTHS_AHEAD months ahead of time, so rows never pile up
+in the DEFAULT partition, and drops whole months once they are past
+retention. Rows older than the cutoff in the month straddling it are still
+removed with a DELETE.
+"""
+
+import re
+from datetime import date, datetime, timedelta, timezone
+from sqlalchemy import delete, select, func, text
 from sqlalchemy.ext.asyncio import AsyncSession
 from app.db.models import AuditLog, Metric
 from app.logging_config import get_logger
 
 logger = get_logger("cleanup")
 
+PARTITIONED_TABLES = ("audit_logs", "metrics")
+# months created beyond the current one; matches migration 0004
+PARTITION_MONTHS_AHEAD = 3
+
+
+def _add_months(month_start: date, months: int) -> date:
+    years, month_index = divmod(month_start.month - 1 + months, 12)
+    return date(month_start.year + years, month_index + 1, 1)
+
+
+def _is_postgres(session) -> bool:
+    return isinstance(session, AsyncSession) and session.bind.dialect.name == "postgresql"
+
+
+async def _is_partitioned(session: AsyncSession, table: str) -> bool:
+    # tables built by metadata.create_all instead of the migrations are plain
+    result = await session.execute(
+        text("SELECT 1 FROM pg_partitioned_table WHERE partrelid = to_regclass(:t)"),
+        {"t": table},
+    )
+    return result.first() is not None
+
+
+async def _create_month_partition(session: AsyncSession, table: str, start: date) -> bool:
+    """Create one month's partition; False if it already exists."""
+    name = f"{table}_{start:%Y_%m}"
+    exists = await session.execute(text("SELECT to_regclass(:n)"), {"n": name})
+    if exists.scalar() is not None:
+        return False
+
+    end = _add_months(start, 1)
+    bounds = {"s": start, "e": end}
+    create = (
+        f"CREATE TABLE {name} PARTITION OF {table} "
+        f"FOR VALUES FROM ('{start.isoformat()}') TO ('{end.isoformat()}')"
+    )
+    in_default = await session.execute(
+        text(f"SELECT EXISTS (SELECT 1 FROM {table}_default "
+             f"WHERE timestamp >= :s AND timestamp < :e)"),
+        bounds,
+    )
+    if not in_default.scalar():
+        await session.execute(text(create))
+        return True
+
+    # Postgres refuses a new partition while DEFAULT holds rows in its range:
+    # take DEFAULT out, create the month, move its rows over, put DEFAULT back.
+    await session.execute(text(f"ALTER TABLE {table} DETACH PARTITION {table}_default"))
+    await session.execute(text(create))
+    await session.execute(
+        text(f"INSERT INTO {name} SELECT * FROM {table}_default "
+             f"WHERE timestamp >= :s AND timestamp < :e"),
+        bounds,
+    )
+    await session.execute(
+        text(f"DELETE FROM {table}_default WHERE timestamp >= :s AND timestamp < :e"),
+        bounds,
+    )
+    await session.execute(text(f"ALTER TABLE {table} ATTACH PARTITION {table}_default DEFAULT"))
+    return True
+
+
+async def ensure_partitions(session: AsyncSession, months_ahead: int = PARTITION_MONTHS_AHEAD) -> list:
+    """Create the monthly partitions for the current and next months_ahead months.
+
+    A no-op outside Postgres. Returns the names of the partitions created.
+    """
+    if not _is_postgres(session):
+        return []
+
+    this_month = datetime.now(timezone.utc).date().replace(day=1)
+    created = []
+    for table in PARTITIONED_TABLES:
+        if not await _is_partitioned(session, table):
+            continue
+        for offset in range(months_ahead + 1):
+            start = _add_months(this_month, offset)
+            if await _create_month_partition(session, table, start):
+                created.append(f"{table}_{start:%Y_%m}")
+    await session.commit()
+
+    if created:
+        logger.info(f"Created log partitions: {', '.join(created)}", partitions=created)
+    return created
+
+
+async def _drop_expired_partitions(session: AsyncSession, table: str, cutoff: datetime) -> int:
+    """Detach and drop the monthly partitions that end before cutoff.
+
+    Returns the number of rows dropped with them.
+    """
+    result = await session.execute(
+        text("SELECT c.relname FROM pg_inherits i "
+             "JOIN pg_class c ON c.oid = i.inhrelid "
+             "WHERE i.inhparent = to_regclass(:t)"),
+        {"t": table},
+    )
+    pattern = re.compile(rf"^{table}_(\d{{4}})_(\d{{2}})$")
+    dropped_rows = 0
+    for (name,) in result.all():
+        match = pattern.match(name)
+        if not match:
+            continue
+        end = _add_months(date(int(match.group(1)), int(match.group(2)), 1), 1)
+        if end > cutoff.date():
+            continue
+        count = await session.execute(text(f"SELECT count(*) FROM {name}"))
+        dropped_rows += count.scalar() or 0
+        await session.execute(text(f"ALTER TABLE {table} DETACH PARTITION {name}"))
+        await session.execute(text(f"DROP TABLE {name}"))
+        logger.info(f"Dropped expired partition {name}", partition=name)
+    return dropped_rows
+
 
 async def cleanup_old_logs(session: AsyncSession, retention_days: int = 30) -> int:
     """Clean up logs older than retention period.
@@ -20,12 +142,19 @@ async def cleanup_old_logs(session: AsyncSession, retention_days: int = 30) -> i
         int: Number of audit logs deleted
     """
     cutoff_date = datetime.now(timezone.utc) - timedelta(days=retention_days)
-    
+
+    dropped = {table: 0 for table in PARTITIONED_TABLES}
+    if _is_postgres(session):
+        await ensure_partitions(session)
+        for table in PARTITIONED_TABLES:
+            if await _is_partitioned(session, table):
+                dropped[table] = await _drop_expired_partitions(session, table, cutoff_date)
+
     # Clean up audit logs
     audit_count_query = await session.execute(
         select(func.count(AuditLog.id)).where(AuditLog.timestamp < cutoff_date)
     )
-    audit_count = audit_count_query.scalar() or 0
+    audit_count = (audit_count_query.scalar() or 0) + dropped["audit_logs"]
     
     await session.execute(
         delete(AuditLog).where(AuditLog.timestamp < cutoff_date)
@@ -35,7 +164,7 @@ async def cleanup_old_logs(session: AsyncSession, retention_days: int = 30) -> i
     metrics_count_query = await session.execute(
         select(func.count(Metric.id)).where(Metric.timestamp < cutoff_date)
     )
-    metrics_count = metrics_count_query.scalar() or 0
+    metrics_count = (metrics_count_query.scalar() or 0) + dropped["metrics"]
     
     await session.execute(
         delete(Metric).where(Metric.timestamp < cutoff_date)
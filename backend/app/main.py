@@ -9,9 +9,9 @@ from app.rate_limiter.middleware import register_rate_limit_middleware
 from app.metrics.middleware import register_metrics_middleware
 from app.validation.middleware import register_validation_middleware
 from fastapi import FastAPI
-from contextlib import asynccontextmanager
+from contextlib import asynccontextmanager, suppress
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, ORJSONResponse
 from fastapi import Request
 from app.api import user
 from app.api.auth import auth_router
@@ -19,12 +19,15 @@ from app.api.apis import router as apis_router
 from .logging_config import configure_logging, get_logger
 from app.middleware.request_logging import register_request_logging
 from app.db import get_db_manager
+from app.api.auth.auth_service import refresh_token_janitor
+import asyncio
 
 # structured logging
 configure_logging(level="INFO")
 logger = get_logger("gateway")
 logger.info("Server starting")
 
+
 DEFAULT_ENVIRONMENTS = [
     {"name": "Production", "slug": "production",
         "description": "Live production environment"},
@@ -114,10 +117,16 @@ async def lifespan(app: FastAPI):
                 f"Failed to initialize any database: {fallback_error}")
             raise
 
+    # revoked/expired refresh tokens are cleaned up here, not per login
+    janitor = asyncio.create_task(refresh_token_janitor())
+
     yield
 
     # Cleanup on shutdown
     logger.info("Shutting down application")
+    janitor.cancel()
+    with suppress(asyncio.CancelledError):
+        await janitor
     try:
         await db_manager.shutdown()
         logger.info("Database connections closed gracefully")
@@ -130,6 +139,7 @@ app = FastAPI(
     description="API for managing gateways and devices",
     version="1.0.0",
     lifespan=lifespan,
+    default_response_class=ORJSONResponse,
 )
 
 # Register middlewares (order matters: Starlette's add_middleware uses insert(0, …)
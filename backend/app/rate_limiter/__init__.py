@@ -6,6 +6,7 @@ from .algorithms import (
     TokenBucketRateLimiter,
 )
 from .middleware import register_rate_limit_middleware, RateLimitExceeded
+from .dependencies import rate_limit
 from .manager import RateLimitManager
 
 __all__ = [
@@ -14,5 +15,6 @@ __all__ = [
     "TokenBucketRateLimiter",
     "register_rate_limit_middleware",
     "RateLimitExceeded",
+    "rate_limit",
     "RateLimitManager",
 ]
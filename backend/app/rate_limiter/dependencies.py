@@ -0,0 +1,45 @@
+"""Per-route rate limit dependencies."""
+
+import time
+from typing import Callable, Optional
+
+from fastapi import Request
+from app.logging_config import get_logger
+from .algorithms import FixedWindowRateLimiter
+from .middleware import RateLimitExceeded
+
+logger = get_logger("rate_limit_dependency")
+
+# Created on first use so the Redis client picks up REDIS_URL at runtime.
+_limiter: Optional[FixedWindowRateLimiter] = None
+
+
+def _get_limiter() -> FixedWindowRateLimiter:
+    global _limiter
+    if _limiter is None:
+        _limiter = FixedWindowRateLimiter()
+    return _limiter
+
+
+def rate_limit(scope: str, limit: int, window_seconds: int = 60) -> Callable:
+    """Dependency factory enforcing `limit` requests per client IP per window.
+
+    Meant for expensive or brute-forceable endpoints (login, OTP): a
+    rejected request costs one Redis INCR instead of a password hash or
+    DB round-trip. `scope` keeps each endpoint's counter separate. Fails
+    open, like the global middleware, when Redis is unreachable.
+    """
+
+    async def _check(request: Request) -> None:
+        client_ip = request.client.host if request.client else "unknown"
+        key = f"{scope}:ip:{client_ip}"
+        allowed, info = await _get_limiter().is_allowed(key, limit, window_seconds)
+        if not allowed:
+            logger.warning(f"Rate limit exceeded for {key}", key=key, limit=limit, window=window_seconds)
+            raise RateLimitExceeded(
+                retry_after=max(1, info.get("reset", 0) - int(time.time())),
+                limit=info["limit"],
+                remaining=info["remaining"],
+            )
+
+    return _check
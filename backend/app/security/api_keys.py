@@ -115,6 +115,7 @@ class APIKeyManager:
         # Create database record (store hashed key)
         api_key = APIKey(
             key=hashed_key,
+            key_sha256=bytes.fromhex(hashed_key),
             label=label or "Unnamed Key",
             scopes=scopes or "",
             environment_id=environment_id,
@@ -170,11 +171,17 @@ class APIKeyManager:
         Uses O(1) direct hash lookup for unsalted keys (the default).
         Falls back to iterating only over salted keys if no direct match.
         """
-        # Fast path: direct lookup by unsalted SHA256 hash (O(1) via DB index)
-        simple_hash = hashlib.sha256(plain_key.encode()).hexdigest()
+        # Fast path: direct lookup by unsalted SHA256 hash (O(1) via DB index).
+        # SQL sessions match the fixed-width binary fingerprint; the fallback
+        # stores only know the hex `key` column.
+        digest = hashlib.sha256(plain_key.encode()).digest()
+        if isinstance(self.session, AsyncSession):
+            match = APIKey.key_sha256 == digest
+        else:
+            match = APIKey.key == digest.hex()
         result = await self.session.execute(
             select(APIKey).where(
-                APIKey.key == simple_hash,
+                match,
                 APIKey.revoked == False,
             )
         )
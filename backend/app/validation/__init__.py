@@ -8,6 +8,8 @@ from .validators import (
     QueryParamValidator,
     HeaderValidator,
     BodyValidator,
+    json_body,
+    json_body_openapi,
 )
 from .sanitizers import (
     sanitize_html,
@@ -26,6 +28,8 @@ __all__ = [
     "QueryParamValidator",
     "HeaderValidator",
     "BodyValidator",
+    "json_body",
+    "json_body_openapi",
     "sanitize_html",
     "sanitize_sql",
     "sanitize_nosql",
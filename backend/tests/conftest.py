@@ -12,6 +12,9 @@ HERE = Path(__file__).parent.parent
 # Add backend directory to Python path so 'app' module can be imported
 sys.path.insert(0, str(HERE))
 
+# the auth tests verify with the fixed dev codes ('1234' email, '9999' OTP)
+os.environ.setdefault("ALLOW_CANONICAL_OTP", "true")
+
 
 def run_alembic_upgrade():
     env = os.environ.copy()
@@ -48,3 +48,24 @@ async def test_duplicate_api_create_returns_conflict():
         assert r1.status_code == 201
         r2 = await ac.post("/apis/", json=payload)
         assert r2.status_code == 409
+
+
+@pytest.mark.asyncio
+async def test_list_apis_paginates():
+    from app.main import app
+    transport = ASGITransport(app=app)
+    async with AsyncClient(transport=transport, base_url="http://testserver") as ac:
+        ids = []
+        for i in range(3):
+            r = await ac.post("/apis/", json={"name": f"page-api-{i}", "version": "v1"})
+            assert r.status_code == 201
+            ids.append(r.json()["id"])
+
+        full = [a["id"] for a in (await ac.get("/apis/", params={"limit": 1000})).json()]
+        page = [a["id"] for a in (await ac.get("/apis/", params={"limit": 2, "offset": 1})).json()]
+        assert page == sorted(full)[1:3]
+
+        assert (await ac.get("/apis/", params={"limit": 0})).status_code == 422
+
+        for api_id in ids:
+            await ac.delete(f"/apis/{api_id}")
@@ -73,3 +73,74 @@ def test_refresh_and_reset_and_verify(client):
     r = client.post("/auth/verify-otp", json={"otp": "9999"})
     assert r.status_code == 200
     assert r.json().get("message") == "OTP verified"
+
+
+def test_verify_password_cache_only_keeps_successes():
+    import asyncio
+    from app.api.auth import auth_service
+
+    hashed = asyncio.run(auth_service.hash_password("secret"))
+    auth_service._VERIFY_CACHE.clear()
+    assert asyncio.run(auth_service.verify_password("wrong", hashed)) is False
+    assert not auth_service._VERIFY_CACHE
+    assert asyncio.run(auth_service.verify_password("secret", hashed)) is True
+    assert len(auth_service._VERIFY_CACHE) == 1
+    assert asyncio.run(auth_service.verify_password("secret", hashed)) is True
+
+
+def test_verify_password_cache_evicts_least_recently_used(monkeypatch):
+    import asyncio
+    from app.api.auth import auth_service
+
+    monkeypatch.setattr(auth_service, "AUTH_VERIFY_CACHE_SIZE", 2)
+    hashes = {pw: asyncio.run(auth_service.hash_password(pw)) for pw in ("a", "b", "c")}
+    auth_service._VERIFY_CACHE.clear()
+    for pw in ("a", "b", "a", "c"):
+        assert asyncio.run(auth_service.verify_password(pw, hashes[pw])) is True
+
+    calls = []
+    real_verify = auth_service._pbkdf2_verify
+    monkeypatch.setattr(auth_service, "_pbkdf2_verify",
+                        lambda pw, h: calls.append(pw) or real_verify(pw, h))
+    # "a" was hit before "c" arrived, so "b" is the one evicted
+    assert asyncio.run(auth_service.verify_password("a", hashes["a"])) is True
+    assert asyncio.run(auth_service.verify_password("b", hashes["b"])) is True
+    assert calls == ["b"]
+
+
+def test_pbkdf2_reads_and_writes_passlib_format():
+    from app.api.auth import auth_service
+
+    # passlib pbkdf2_sha256 hash of "password"
+    legacy = "$pbkdf2-sha256$6400$0ZrzXitFSGltTQnBWOsdAw$Y11AchqV4b0sUisdZd0Xr97KWoymNE0LNNrnEgY4H9M"
+    assert auth_service._pbkdf2_verify("password", legacy)
+    assert not auth_service._pbkdf2_verify("wrong", legacy)
+
+    hashed = auth_service._pbkdf2_hash("secret")
+    assert hashed.startswith("$pbkdf2-sha256$29000$")
+    assert auth_service._pbkdf2_verify("secret", hashed)
+    assert auth_service.pwd_context.verify("secret", hashed)
+
+
+def test_create_token_is_a_standard_hs256_jwt():
+    import jwt
+    from app.api.auth import auth_service
+
+    token, jti = auth_service._create_token("dave@example.com", 60, extra_claims={"roles": "admin"})
+    payload = jwt.decode(token, auth_service.JWT_SECRET, algorithms=[auth_service.JWT_ALGORITHM])
+    assert payload["sub"] == "dave@example.com"
+    assert payload["jti"] == jti
+    assert payload["roles"] == "admin"
+    assert jwt.get_unverified_header(token) == {"alg": "HS256", "typ": "JWT"}
+
+
+def test_verified_emails_are_a_bounded_lru_set(monkeypatch):
+    from collections import OrderedDict
+    from app.api.auth import auth_service
+
+    monkeypatch.setattr(auth_service, "EMAIL_VERIFIED_MAX_ENTRIES", 2)
+    monkeypatch.setattr(auth_service, "_EMAIL_VERIFIED", OrderedDict())
+    for email in ("a@example.com", "b@example.com", "a@example.com", "c@example.com"):
+        auth_service._mark_email_verified(email)
+    # "a" was re-verified before "c" arrived, so "b" is the one evicted
+    assert list(auth_service._EMAIL_VERIFIED) == ["a@example.com", "c@example.com"]
@@ -357,3 +357,39 @@ class TestRateLimitMiddleware:
 
 
 # Run tests with: pytest tests/test_rate_limiting.py -v
+
+
+class TestRateLimitDependency:
+    """Test the per-route rate_limit dependency."""
+
+    async def test_rejects_after_limit(self, monkeypatch):
+        """Requests over the limit for one client raise 429."""
+        from types import SimpleNamespace
+        from app.rate_limiter import dependencies, RateLimitExceeded
+
+        class CountingLimiter:
+            def __init__(self):
+                self.counts = {}
+
+            async def is_allowed(self, key, limit, window_seconds):
+                self.counts[key] = self.counts.get(key, 0) + 1
+                count = self.counts[key]
+                return count <= limit, {
+                    "limit": limit,
+                    "remaining": max(0, limit - count),
+                    "reset": int(time.time()) + window_seconds,
+                }
+
+        monkeypatch.setattr(dependencies, "_limiter", CountingLimiter())
+        check = dependencies.rate_limit("test", limit=2, window_seconds=60)
+        request = SimpleNamespace(client=SimpleNamespace(host="10.0.0.1"))
+
+        await check(request)
+        await check(request)
+        with pytest.raises(RateLimitExceeded) as exc:
+            await check(request)
+        assert exc.value.status_code == 429
+        assert int(exc.value.headers["Retry-After"]) >= 1
+
+        # other clients keep their own budget
+        await check(SimpleNamespace(client=SimpleNamespace(host="10.0.0.2")))
@@ -0,0 +1,169 @@
+"""
+Test cases for the Redis cache in front of the RBAC list endpoints.
+
+Tests:
+1. Miss populates the cache, hit skips the database
+2. Role/permission mutations and the RBAC init job invalidate it
+3. Disabled (TTL 0) and Redis failures fall through to the database
+"""
+
+import json
+from contextlib import asynccontextmanager
+from datetime import datetime, timezone
+from types import SimpleNamespace
+
+import pytest
+
+from app.api import admin
+from app.api import authorizers
+from app.authorizers import cache
+
+
+class FakeRedis:
+    def __init__(self):
+        self.store = {}
+        self.ttls = {}
+
+    async def get(self, key):
+        return self.store.get(key)
+
+    async def set(self, key, value, ex=None):
+        self.store[key] = value
+        self.ttls[key] = ex
+
+    async def delete(self, *keys):
+        for key in keys:
+            self.store.pop(key, None)
+
+
+class BrokenRedis:
+    async def get(self, key):
+        raise ConnectionError("redis down")
+
+    async def set(self, key, value, ex=None):
+        raise ConnectionError("redis down")
+
+    async def delete(self, *keys):
+        raise ConnectionError("redis down")
+
+
+def _role(role_id, name):
+    return SimpleNamespace(
+        id=role_id,
+        name=name,
+        description=None,
+        permissions=["api:read"],
+        created_at=datetime(2026, 1, 1, tzinfo=timezone.utc),
+        updated_at=None,
+    )
+
+
+class FakeManager:
+    def __init__(self, roles=()):
+        self.roles = list(roles)
+        self.list_calls = 0
+
+    async def list_roles(self):
+        self.list_calls += 1
+        return list(self.roles)
+
+    async def create_role(self, **kwargs):
+        role = _role(len(self.roles) + 1, kwargs["name"])
+        self.roles.append(role)
+        return role
+
+    async def delete_role(self, role_id):
+        return True
+
+
+@pytest.fixture
+def redis_cache(monkeypatch):
+    fake = FakeRedis()
+    monkeypatch.setattr(cache, "RBAC_CACHE_TTL", 60)
+    monkeypatch.setattr(cache, "get_redis_client", lambda: fake)
+    return fake
+
+
+class TestRBACListCache:
+    """Test caching of the role listing."""
+
+    async def test_miss_then_hit(self, redis_cache):
+        manager = FakeManager([_role(1, "admin")])
+
+        first = await authorizers.list_roles(manager=manager, current_user=None)
+        assert manager.list_calls == 1
+        assert redis_cache.store[cache.ROLES_CACHE_KEY] == first.body
+        assert redis_cache.ttls[cache.ROLES_CACHE_KEY] == 60
+
+        second = await authorizers.list_roles(manager=manager, current_user=None)
+        assert manager.list_calls == 1
+        assert second.body == first.body
+        assert json.loads(second.body)[0]["name"] == "admin"
+        assert json.loads(second.body)[0]["created_at"] == "2026-01-01T00:00:00+00:00"
+
+    async def test_mutation_invalidates(self, redis_cache):
+        manager = FakeManager([_role(1, "admin")])
+        await authorizers.list_roles(manager=manager, current_user=None)
+        redis_cache.store[cache.PERMISSIONS_CACHE_KEY] = b"[]"
+
+        payload = authorizers.RoleCreate(name="auditor")
+        await authorizers.create_role(payload, manager=manager, current_user=None)
+        assert cache.ROLES_CACHE_KEY not in redis_cache.store
+        assert cache.PERMISSIONS_CACHE_KEY not in redis_cache.store
+
+        listed = await authorizers.list_roles(manager=manager, current_user=None)
+        assert manager.list_calls == 2
+        assert [r["name"] for r in json.loads(listed.body)] == ["admin", "auditor"]
+
+        await authorizers.delete_role(1, manager=manager, current_user=None)
+        assert cache.ROLES_CACHE_KEY not in redis_cache.store
+
+    async def test_init_job_invalidates(self, redis_cache, monkeypatch):
+        redis_cache.store[cache.ROLES_CACHE_KEY] = b"[]"
+        redis_cache.store[cache.PERMISSIONS_CACHE_KEY] = b"[]"
+
+        @asynccontextmanager
+        async def fake_session():
+            yield object()
+
+        async def fake_init(db, force=False):
+            return {
+                "permissions_created": ["api:read"],
+                "permissions_skipped": [],
+                "roles_created": ["admin"],
+                "roles_skipped": [],
+                "errors": [],
+            }
+
+        monkeypatch.setattr(admin, "get_db_manager", lambda: SimpleNamespace(get_session=fake_session))
+        monkeypatch.setattr(admin, "init_rbac_system", fake_init)
+        monkeypatch.setattr(admin, "mark_rbac_ready", lambda: None)
+        job = admin.InitRBACJob(job_id="job-1", status="queued")
+        monkeypatch.setitem(admin._RBAC_JOBS, job.job_id, job)
+        monkeypatch.setattr(admin, "_RBAC_JOBS_FINISHED", {})
+
+        await admin._run_init(job.job_id, force=False)
+
+        assert job.status == "done"
+        assert redis_cache.store == {}
+
+    async def test_disabled_skips_redis(self, monkeypatch):
+        monkeypatch.setattr(cache, "RBAC_CACHE_TTL", 0)
+
+        def no_redis():
+            raise AssertionError("redis must not be used when the cache is off")
+
+        monkeypatch.setattr(cache, "get_redis_client", no_redis)
+        manager = FakeManager([_role(1, "admin")])
+        await authorizers.list_roles(manager=manager, current_user=None)
+        await authorizers.list_roles(manager=manager, current_user=None)
+        assert manager.list_calls == 2
+
+    async def test_redis_errors_fail_open(self, monkeypatch):
+        monkeypatch.setattr(cache, "RBAC_CACHE_TTL", 60)
+        monkeypatch.setattr(cache, "get_redis_client", lambda: BrokenRedis())
+        manager = FakeManager([_role(1, "admin")])
+
+        response = await authorizers.list_roles(manager=manager, current_user=None)
+        assert json.loads(response.body)[0]["name"] == "admin"
+        await cache.invalidate_rbac_cache()
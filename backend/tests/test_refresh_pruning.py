@@ -1,13 +1,28 @@
+from datetime import datetime, timedelta, timezone
 from fastapi.testclient import TestClient
 from app.api.auth import auth_service
 from app.db import get_db_manager
-from app.db.models import RefreshToken, User
+from app.db.models import Base, RefreshToken, User
 from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from sqlalchemy.orm import sessionmaker
 import asyncio
 
 import pytest
 
 
+@pytest.fixture
+async def db_session():
+    """In-memory SQLite session, so the prune DELETE runs as real SQL."""
+    engine = create_async_engine("sqlite+aiosqlite:///:memory:", echo=False)
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    async_session = sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+    async with async_session() as session:
+        yield session
+    await engine.dispose()
+
+
 @pytest.fixture
 def client():
     from app.main import app
@@ -36,9 +51,92 @@ def test_refresh_token_pruning(client, monkeypatch):
             if not user:
                 return 0
             q = await session.execute(
-                select(RefreshToken).where(not RefreshToken.revoked).where(RefreshToken.user_id == user.id)
+                select(RefreshToken).where(RefreshToken.revoked.is_(False)).where(RefreshToken.user_id == user.id)
             )
             return len(q.scalars().all())
 
     active_count = asyncio.run(_count_active())
     assert active_count <= 3
+
+
+async def test_prune_refresh_tokens_bulk_delete(db_session):
+    now = datetime.now(timezone.utc)
+    later = now + timedelta(days=7)
+
+    alice = User(email="alice@example.com", hashed_password="x")
+    bob = User(email="bob@example.com", hashed_password="x")
+    db_session.add_all([alice, bob])
+    await db_session.flush()
+
+    def token(name, user, created_minutes_ago, expires_at=later, revoked=False):
+        return RefreshToken(
+            token=name,
+            user_id=user.id,
+            created_at=now - timedelta(minutes=created_minutes_ago),
+            expires_at=expires_at,
+            revoked=revoked,
+        )
+
+    db_session.add_all([
+        # alice: live tokens are left alone, the cap is applied at insert
+        token("a-newest", alice, 1),
+        token("a-oldest", alice, 2),
+        # bob: one live, one revoked, one expired
+        token("b-live", bob, 1),
+        token("b-revoked", bob, 2, revoked=True),
+        token("b-expired", bob, 3, expires_at=now - timedelta(minutes=1)),
+    ])
+    await db_session.commit()
+
+    removed = await auth_service.prune_refresh_tokens(db_session)
+
+    remaining = await db_session.execute(select(RefreshToken.token))
+    assert sorted(remaining.scalars().all()) == ["a-newest", "a-oldest", "b-live"]
+    assert removed == 2
+
+
+@pytest.fixture
+def sql_login(db_session, monkeypatch):
+    monkeypatch.setattr(auth_service, "REFRESH_TOKEN_STORE", "sql")
+    monkeypatch.setattr(auth_service, "MAX_REFRESH_TOKENS_PER_USER", 2)
+
+    async def verify_password(password, hashed):
+        return True
+
+    monkeypatch.setattr(auth_service, "verify_password", verify_password)
+
+    async def login():
+        data = await auth_service.login_user("carol@example.com", "pwd", db_session)
+        return data["refresh_token"]
+
+    return login
+
+
+async def _token_count(session):
+    result = await session.execute(select(RefreshToken.id))
+    return len(result.scalars().all())
+
+
+async def test_login_enforces_cap(db_session, sql_login):
+    db_session.add(User(email="carol@example.com", hashed_password="x"))
+    await db_session.commit()
+
+    tokens = [await sql_login() for _ in range(3)]
+    assert await _token_count(db_session) == 2
+
+    # the oldest token went in the login transaction, not via the janitor
+    assert await auth_service.refresh_tokens(tokens[0], db_session) == {"error": "invalid_token"}
+
+
+async def test_refresh_drops_rotated_token_past_cap(db_session, sql_login):
+    db_session.add(User(email="carol@example.com", hashed_password="x"))
+    await db_session.commit()
+
+    tokens = [await sql_login() for _ in range(2)]
+    rotated = await auth_service.refresh_tokens(tokens[1], db_session)
+    assert "refresh_token" in rotated
+
+    # the revoked token is outside the newest-active set, so it is deleted
+    assert await _token_count(db_session) == 2
+    assert await auth_service.refresh_tokens(tokens[1], db_session) == {"error": "invalid_token"}
+    assert "refresh_token" in await auth_service.refresh_tokens(tokens[0], db_session)
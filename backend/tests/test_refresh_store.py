@@ -0,0 +1,128 @@
+"""
+Test cases for the Redis refresh-token store (REFRESH_TOKEN_STORE=redis).
+
+The fake client mirrors each Lua script step by step on in-memory keys, so
+the tests cover the store's key layout and the auth service's use of it:
+issue -> rotate (old token rejected) -> revoke, and the per-user cap.
+"""
+
+import itertools
+from types import SimpleNamespace
+
+import pytest
+
+from app.api.auth import auth_service, refresh_store
+
+
+class FakeRedis:
+    def __init__(self):
+        self.kv = {}
+        self.ttls = {}
+        self.zsets = {}
+
+    def register_script(self, source):
+        impl = {
+            refresh_store._ISSUE_LUA: self._issue,
+            refresh_store._ROTATE_LUA: self._rotate,
+            refresh_store._REVOKE_LUA: self._revoke,
+        }[source]
+
+        async def run(keys=None, args=None):
+            # decode_responses=True: arguments go over the wire as strings
+            return impl(*[str(a) for a in args])
+
+        return run
+
+    # --- mirrors of the Lua scripts -------------------------------------
+    def _store(self, uid, hashed, ttl, now, max_per_user):
+        self.kv[f"rt:{hashed}"] = uid
+        self.ttls[f"rt:{hashed}"] = int(ttl)
+        idx = self.zsets.setdefault(f"rtu:{uid}", {})
+        idx[hashed] = float(now)
+        ordered = sorted(idx, key=lambda member: (idx[member], member))
+        for stale in ordered[:max(0, len(ordered) - int(max_per_user))]:
+            self.kv.pop(f"rt:{stale}", None)
+            del idx[stale]
+
+    def _issue(self, uid, hashed, ttl, now, max_per_user):
+        self._store(uid, hashed, ttl, now, max_per_user)
+        return 1
+
+    def _rotate(self, old, new, ttl, now, max_per_user):
+        uid = self.kv.pop(f"rt:{old}", None)
+        if uid is None:
+            return None
+        self.zsets.get(f"rtu:{uid}", {}).pop(old, None)
+        self._store(uid, new, ttl, now, max_per_user)
+        return uid
+
+    def _revoke(self, hashed):
+        uid = self.kv.pop(f"rt:{hashed}", None)
+        if uid is None:
+            return None
+        self.zsets.get(f"rtu:{uid}", {}).pop(hashed, None)
+        return uid
+
+
+@pytest.fixture
+def redis_store(monkeypatch):
+    fake = FakeRedis()
+    monkeypatch.setattr(auth_service, "REFRESH_TOKEN_STORE", "redis")
+    monkeypatch.setattr(refresh_store, "get_redis_client", lambda: fake)
+    monkeypatch.setattr(refresh_store, "_scripts", None)
+    monkeypatch.setattr(refresh_store, "_scripts_client", None)
+    # strictly increasing issue times, so the cap's ordering is deterministic
+    clock = itertools.count(1_000_000)
+    monkeypatch.setattr(refresh_store, "time", SimpleNamespace(time=lambda: next(clock)))
+
+    user = SimpleNamespace(id=7, roles="", is_superuser=False, hashed_password="x")
+
+    async def fetch_user(session, email):
+        return user
+
+    async def verify_password(password, hashed):
+        return True
+
+    monkeypatch.setattr(auth_service, "_fetch_user_by_email", fetch_user)
+    monkeypatch.setattr(auth_service, "verify_password", verify_password)
+    return fake
+
+
+async def _login():
+    data = await auth_service.login_user("redis@example.com", "pwd", None)
+    return data["refresh_token"]
+
+
+async def test_issue_rotate_revoke(redis_store):
+    first = await _login()
+    assert len(redis_store.kv) == 1
+    assert list(redis_store.ttls.values()) == [auth_service.REFRESH_TOKEN_EXPIRE_SECONDS]
+
+    rotated = await auth_service.refresh_tokens(first, None)
+    second = rotated["refresh_token"]
+    assert rotated["access_token"] and second != first
+    assert len(redis_store.kv) == 1
+    assert len(redis_store.zsets["rtu:7"]) == 1
+
+    # the rotated-out token is single-use
+    assert await auth_service.refresh_tokens(first, None) == {"error": "invalid_token"}
+
+    assert await auth_service.logout_refresh_token(second, None) == {"message": "revoked"}
+    assert redis_store.kv == {}
+    assert redis_store.zsets["rtu:7"] == {}
+    assert await auth_service.refresh_tokens(second, None) == {"error": "invalid_token"}
+    assert await auth_service.logout_refresh_token(second, None) == {"error": "not_found"}
+
+
+async def test_per_user_cap(redis_store, monkeypatch):
+    monkeypatch.setattr(auth_service, "MAX_REFRESH_TOKENS_PER_USER", 2)
+
+    tokens = [await _login() for _ in range(3)]
+    assert len(redis_store.kv) == 2
+    assert len(redis_store.zsets["rtu:7"]) == 2
+
+    # the oldest token was dropped; the newest two still rotate
+    assert await auth_service.refresh_tokens(tokens[0], None) == {"error": "invalid_token"}
+    for token in tokens[1:]:
+        assert "refresh_token" in await auth_service.refresh_tokens(token, None)
+    assert len(redis_store.kv) == 2
@@ -273,4 +273,46 @@ class TestValidationMiddleware:
         pass
 
 
+class TestJsonBody:
+    """Test the json_body dependency and its published schema."""
+
+    def _app(self):
+        from fastapi import Depends, FastAPI
+        from pydantic import BaseModel
+        from app.validation import json_body, json_body_openapi
+
+        class Item(BaseModel):
+            name: str
+            count: int = 0
+
+        app = FastAPI()
+
+        @app.post("/items", openapi_extra=json_body_openapi(Item))
+        async def create_item(item: Item = Depends(json_body(Item))):
+            return {"name": item.name, "count": item.count}
+
+        return app
+
+    def test_schema_is_published(self):
+        from fastapi.testclient import TestClient
+
+        spec = TestClient(self._app()).get("/openapi.json").json()
+        body = spec["paths"]["/items"]["post"]["requestBody"]
+        assert body["required"] is True
+        schema = body["content"]["application/json"]["schema"]
+        assert schema["required"] == ["name"]
+        assert set(schema["properties"]) == {"name", "count"}
+
+    def test_errors_are_located_under_body(self):
+        from fastapi.testclient import TestClient
+
+        client = TestClient(self._app())
+        assert client.post("/items", json={"name": "a", "count": 2}).json() == {"name": "a", "count": 2}
+
+        r = client.post("/items", json={"count": "many"})
+        assert r.status_code == 422
+        locs = {tuple(err["loc"]) for err in r.json()["detail"]}
+        assert locs == {("body", "name"), ("body", "count")}
+
+
 # Run tests with: pytest tests/test_validation.py -v